@@ -0,0 +1,233 @@
+# answer_cache.py
+# Semantic answer cache for the query API: answers are keyed on the query
+# embedding, so "mid sem exam date?" can reuse the answer to "when is the mid-sem exam".
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lexical_index import tokenize
+
+
+def directory_fingerprint(path: str) -> Optional[Tuple]:
+    """
+    Cheap fingerprint of an index directory (Chroma, numpy or lexical): (name, inode,
+    size, mtime) of the directory and its direct entries. Changes whenever
+    build_vectordb.py rebuilds, updates or swaps in the index. Returns None if the
+    directory is missing.
+    """
+    try:
+        st = os.stat(path)
+        parts = [("", st.st_ino, st.st_mtime_ns)]
+        with os.scandir(path) as it:
+            for entry in it:
+                est = entry.stat()
+                parts.append((entry.name, est.st_ino, est.st_size, est.st_mtime_ns))
+        return tuple(sorted(parts))
+    except OSError:
+        return None
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def exact_terms(query: str) -> str:
+    """
+    The query's tokens that contain a digit (course codes, years, semesters), sorted and
+    space-joined. MiniLM barely separates "MA101 syllabus" from "MA102 syllabus" or
+    "2023 fee" from "2024 fee", so a semantic hit must have exactly the same ones.
+    """
+    return " ".join(sorted({tok for tok in tokenize(query) if any(c.isdigit() for c in tok)}))
+
+
+class SemanticAnswerCache:
+    """
+    Thread-safe LRU + TTL cache of answers keyed on normalized query embeddings.
+    A lookup hits when the best cosine similarity is >= `threshold`. Entries only
+    match lookups with the same `scope` (e.g. the query's metadata filters) and the
+    same exact_terms of the query text.
+    If `fingerprint_fn` is given, the cache clears itself whenever its value changes
+    (checked at most every `check_interval_s` seconds).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl_s: float = 3600.0,
+        max_entries: int = 1024,
+        fingerprint_fn: Optional[Callable[[], object]] = None,
+        check_interval_s: float = 1.0,
+    ):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self._fingerprint_fn = fingerprint_fn
+        self._check_interval_s = check_interval_s
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, dict, float, str, str]]" = OrderedDict()
+        self._next_key = 0
+        self._matrix: Optional[np.ndarray] = None  # stacked vectors, rebuilt lazily
+        self._matrix_keys: list = []
+        self._matrix_scopes: Optional[np.ndarray] = None
+        self._matrix_terms: Optional[np.ndarray] = None
+
+        self._fingerprint = fingerprint_fn() if fingerprint_fn else None
+        self._last_check = time.monotonic()
+
+        self._inflight: dict = {}  # (normalized query, scope) -> Future
+        self._async_inflight: dict = {}  # (normalized query, scope) -> asyncio.Future (event-loop callers)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.deduplicated = 0
+
+    # --- internals (call with self._lock held) ---
+    def _check_fingerprint(self, now: float):
+        if self._fingerprint_fn is None or now - self._last_check < self._check_interval_s:
+            return
+        self._last_check = now
+        fp = self._fingerprint_fn()
+        if fp != self._fingerprint:
+            self._fingerprint = fp
+            if self._entries:
+                print(f"Answer cache invalidated: vector DB changed ({len(self._entries)} entries dropped).")
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+
+    def _expire(self, now: float):
+        expired = [key for key, (_, _, created, _, _) in self._entries.items() if now - created > self.ttl_s]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self.expirations += len(expired)
+            self._matrix = None
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0 else v
+
+    # --- public API ---
+    def get(self, vector: Sequence[float], scope: str = "", query: str = "") -> Optional[dict]:
+        v = self._normalize(vector)
+        terms = exact_terms(query)
+        now = time.monotonic()
+        with self._lock:
+            self._check_fingerprint(now)
+            self._expire(now)
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[key][0] for key in self._matrix_keys])
+                self._matrix_scopes = np.asarray([self._entries[key][3] for key in self._matrix_keys], dtype=object)
+                self._matrix_terms = np.asarray([self._entries[key][4] for key in self._matrix_keys], dtype=object)
+            sims = self._matrix @ v
+            sims[(self._matrix_scopes != scope) | (self._matrix_terms != terms)] = -np.inf
+            best = int(np.argmax(sims))
+            if float(sims[best]) < self.threshold:
+                self.misses += 1
+                return None
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(self._entries[key][1])
+
+    def put(self, vector: Sequence[float], result: dict, scope: str = "", query: str = ""):
+        v = self._normalize(vector)
+        terms = exact_terms(query)
+        with self._lock:
+            self._check_fingerprint(time.monotonic())
+            self._entries[self._next_key] = (v, dict(result), time.monotonic(), scope, terms)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def single_flight(self, query: str, compute: Callable[[], dict], scope: str = "") -> dict:
+        """
+        Run `compute` once per normalized query text (and scope); concurrent callers with
+        the same query wait for and share the first caller's result (or exception).
+        """
+        key = (normalize_query(query), scope)
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+            else:
+                self.deduplicated += 1
+        if not leader:
+            return dict(fut.result())
+        try:
+            result = compute()
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def async_single_flight(self, query: str, compute: Callable[[], Awaitable[dict]], scope: str = "") -> dict:
+        """single_flight for coroutines running on one event loop."""
+        key = (normalize_query(query), scope)
+        fut = self._async_inflight.get(key)
+        if fut is not None:
+            self.deduplicated += 1
+            return dict(await asyncio.shield(fut))
+        fut = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = fut
+        try:
+            result = await compute()
+            fut.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            # mark retrieved so an exception nobody else awaited isn't logged as unhandled
+            fut.exception()
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "deduplicated_inflight": self.deduplicated,
+                "inflight": len(self._inflight) + len(self._async_inflight),
+            }
@@ -0,0 +1,198 @@
+# context_builder.py
+# Turns retrieved chunks into the prompt context. build_vectordb.py splits with a
+# 200-char overlap, so neighbouring chunks of one document repeat text; this merges
+# them back, drops near-duplicates and packs the result into a token budget.
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Minimum shared characters for a text-only (no start_index) overlap merge
+MIN_TEXT_OVERLAP = 20
+# Longest suffix/prefix overlap searched for when merging without offsets
+MAX_TEXT_OVERLAP = 400
+# Word 3-gram Jaccard similarity above which a block counts as a duplicate
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Don't bother including a truncated block smaller than this
+MIN_TRUNCATED_TOKENS = 32
+
+_WORD_RE = re.compile(r"\w+")
+
+# Per model name (None = cl100k_base default)
+_token_counters: Dict[Optional[str], Callable[[str], int]] = {}
+
+
+def _approx_tokens(text: str) -> int:
+    # ~4 characters per token for English BPE vocabularies
+    return (len(text) + 3) // 4
+
+
+def get_token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """tiktoken's count for `model` when tiktoken is installed, else a chars/4 estimate."""
+    counter = _token_counters.get(model)
+    if counter is None:
+        try:
+            import tiktoken
+
+            try:
+                enc = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                enc = tiktoken.get_encoding("cl100k_base")
+            counter = lambda text: len(enc.encode(text, disallowed_special=()))
+        except Exception:
+            counter = _approx_tokens
+        _token_counters[model] = counter
+    return counter
+
+
+class _Block:
+    __slots__ = ("text", "meta", "rank", "start", "end")
+
+    def __init__(self, text: str, meta: dict, rank: int):
+        self.text = text
+        self.meta = meta
+        self.rank = rank
+        start = meta.get("start_index")
+        self.start = start if isinstance(start, int) and start >= 0 else None
+        self.end = self.start + len(text) if self.start is not None else None
+
+
+def _source_key(meta: dict) -> str:
+    return meta.get("source_file") or meta.get("source") or meta.get("file") or meta.get("source_id") or ""
+
+
+def _text_overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (0 if below MIN_TEXT_OVERLAP)."""
+    for n in range(min(len(a), len(b), MAX_TEXT_OVERLAP), MIN_TEXT_OVERLAP - 1, -1):
+        if a.endswith(b[:n]):
+            return n
+    return 0
+
+
+def _merge_group(blocks: List[_Block]) -> List[_Block]:
+    """Merge overlapping/adjacent chunks of one source document."""
+    positioned = sorted((b for b in blocks if b.start is not None), key=lambda b: b.start)
+    merged: List[_Block] = []
+    for block in positioned:
+        prev = merged[-1] if merged else None
+        if prev is not None and block.start <= prev.end:
+            if block.end > prev.end:
+                prev.text += block.text[prev.end - block.start:]
+                prev.end = block.end
+            prev.rank = min(prev.rank, block.rank)
+        else:
+            merged.append(block)
+
+    # Chunks without offsets: merge on literal suffix/prefix overlap
+    for block in (b for b in blocks if b.start is None):
+        for prev in merged:
+            if block.text in prev.text:
+                prev.rank = min(prev.rank, block.rank)
+                break
+            n = _text_overlap(prev.text, block.text)
+            if n:
+                prev.text += block.text[n:]
+                prev.rank = min(prev.rank, block.rank)
+                break
+            n = _text_overlap(block.text, prev.text)
+            if n:
+                prev.text = block.text + prev.text[n:]
+                prev.rank = min(prev.rank, block.rank)
+                break
+        else:
+            merged.append(block)
+    return merged
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    lo, hi = 0, len(text)
+    while lo < hi:  # longest prefix that fits
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text[:lo]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > len(cut) // 2 else cut).rstrip() + " ..."
+
+
+def build_context(docs: Sequence, token_budget: int = 0, count_tokens: Optional[Callable[[str], int]] = None) -> Tuple[str, List[str], dict]:
+    """
+    Build the prompt context from retrieved docs (best first).
+    Returns (context text, sources in context order, stats). `token_budget` <= 0 means no cap.
+    """
+    count_tokens = count_tokens or get_token_counter()
+
+    groups = {}
+    raw_texts = []
+    for rank, d in enumerate(docs):
+        text = getattr(d, "page_content", None) or getattr(d, "text", None) or ""
+        if not text:
+            continue
+        raw_texts.append(text)
+        meta = getattr(d, "metadata", {}) or {}
+        groups.setdefault(_source_key(meta), []).append(_Block(text, meta, rank))
+
+    merged = [block for group in groups.values() for block in _merge_group(group)]
+    merged.sort(key=lambda b: b.rank)
+
+    kept: List[_Block] = []
+    kept_shingles: List[set] = []
+    duplicates = 0
+    for block in merged:
+        sh = _shingles(block.text)
+        if any(_jaccard(sh, other) >= NEAR_DUPLICATE_THRESHOLD for other in kept_shingles):
+            duplicates += 1
+            continue
+        kept.append(block)
+        kept_shingles.append(sh)
+
+    pieces: List[str] = []
+    sources: List[str] = []
+    used = 0
+    truncated = 0
+    for block in kept:
+        tokens = count_tokens(block.text)
+        text = block.text
+        if token_budget > 0 and used + tokens > token_budget:
+            remaining = token_budget - used
+            if remaining < MIN_TRUNCATED_TOKENS:
+                break
+            text = _truncate_to_tokens(text, remaining, count_tokens)
+            tokens = count_tokens(text)
+            truncated += 1
+        pieces.append(text)
+        used += tokens
+        source = block.meta.get("source") or block.meta.get("file") or block.meta.get("source_id")
+        if source:
+            sources.append(source)
+        if token_budget > 0 and used >= token_budget:
+            break
+
+    naive_tokens = count_tokens("\n\n".join(raw_texts)) if raw_texts else 0
+    context = "\n\n".join(pieces)
+    context_tokens = count_tokens(context) if pieces else 0
+    stats = {
+        "chunks": len(raw_texts),
+        "blocks": len(pieces),
+        "merged": len(raw_texts) - len(merged),
+        "duplicates": duplicates,
+        "truncated": truncated,
+        "dropped": len(kept) - len(pieces),
+        "tokens_before": naive_tokens,
+        "tokens_after": context_tokens,
+        "tokens_saved": naive_tokens - context_tokens,
+    }
+    return context, sources, stats
@@ -0,0 +1,105 @@
+# embedding_backends.py
+# Builds the embeddings object for main.py, embedding_service.py and
+# scripts/build_vectordb.py, selected by EMBEDDING_BACKEND:
+#   huggingface  sentence-transformers through LangChain (PyTorch)
+#   onnx         the model exported by scripts/export_onnx.py, run with onnxruntime;
+#                ONNX_QUANTIZED=1 uses the int8 dynamically quantized graph
+# Both produce mean-pooled, L2-normalized vectors (what all-MiniLM-L6-v2's
+# sentence-transformers pipeline does), so an index built with one can be queried
+# with the other; scripts/check_embedding_parity.py measures how close they are.
+import os
+import json
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+SUPPORTED_BACKENDS = ("huggingface", "onnx")
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+
+def default_onnx_dir(model_name: str) -> str:
+    return os.path.join(MODELS_DIR, model_name.rstrip("/").split("/")[-1] + "-onnx")
+
+
+def embedding_model_id(model_name: str, backend: str = "huggingface", quantized: bool = False) -> str:
+    """
+    Identity of the vectors a configuration produces. Stored in the build manifest and
+    embedding cache, and compared by the embedding sidecar, so vectors from different
+    backends are never mixed silently. The PyTorch model keeps the bare model name.
+    """
+    if backend == "onnx":
+        return f"{model_name}@onnx" + ("-int8" if quantized else "")
+    return model_name
+
+
+class OnnxEmbeddings:
+    """
+    LangChain-compatible embeddings on onnxruntime: tokenizers for tokenization,
+    mean pooling over the attention mask and L2 normalization in NumPy.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0, batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, "export.json"), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.model_path = os.path.join(model_dir, "model.int8.onnx" if quantized else "model.onnx")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=int(self.info.get("max_seq_length", 256)))
+        self.tokenizer.enable_padding(pad_id=int(self.info.get("pad_token_id", 0)),
+                                      pad_token=self.info.get("pad_token", "[PAD]"))
+        self.normalize = bool(self.info.get("normalize", True))
+        self.batch_size = max(1, batch_size)
+
+    def _embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]  # (batch, sequence, dim) token embeddings
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batch texts of similar length together so little compute goes to padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            for i, vector in zip(idx, self._embed_batch([texts[i] for i in idx])):
+                out[i] = vector.tolist()
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings(model_name: str, backend: str = "huggingface", device: str = "cpu",
+                    onnx_dir: Optional[str] = None, quantized: bool = False, threads: int = 0):
+    if backend == "onnx":
+        model_dir = onnx_dir or default_onnx_dir(model_name)
+        if not os.path.exists(os.path.join(model_dir, "export.json")):
+            raise FileNotFoundError(f"no ONNX export in '{model_dir}'; run scripts/export_onnx.py first")
+        return OnnxEmbeddings(model_dir, quantized=quantized, threads=threads)
+    if backend == "huggingface":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
+    raise ValueError(f"EMBEDDING_BACKEND must be one of {SUPPORTED_BACKENDS}, got {backend!r}")
@@ -0,0 +1,131 @@
+# embedding_batcher.py
+# Collects query embeddings from concurrent requests into one model call.
+# Request handlers run answer_with_retrieval in executor threads; each thread calls
+# EmbeddingBatcher.embed() and blocks until the background worker has embedded the
+# batch its text landed in.
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+# Upper bounds of the batch-size histogram buckets (last bucket is +Inf)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches texts for `embed_fn` (e.g. HuggingFaceEmbeddings.embed_documents).
+    A batch is flushed when it reaches `max_batch_size` or `max_wait_ms` after its
+    first text arrived, whichever comes first.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], Sequence[Sequence[float]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.batches = 0
+        self.items = 0
+        self.embed_seconds = 0.0
+        self.histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def embed(self, text: str) -> List[float]:
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher is closed")
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut.result()
+
+    def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        """Queue every text at once; they share batches with each other and with other callers."""
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher is closed")
+        self._ensure_worker()
+        futures = []
+        for text in texts:
+            fut: Future = Future()
+            self._queue.put((text, fut))
+            futures.append(fut)
+        return [fut.result() for fut in futures]
+
+    def close(self):
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # re-post the shutdown marker for the outer loop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            texts = [text for text, _ in batch]
+            started = time.perf_counter()
+            try:
+                vectors = self.embed_fn(texts)
+            except BaseException as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self._record(len(batch), time.perf_counter() - started)
+            for (_, fut), vector in zip(batch, vectors):
+                fut.set_result(list(vector))
+
+    def _record(self, size: int, seconds: float):
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.embed_seconds += seconds
+            for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if size <= bound:
+                    self.histogram[i] += 1
+                    break
+            else:
+                self.histogram[-1] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = [str(b) for b in BATCH_SIZE_BUCKETS] + ["+Inf"]
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": (self.items / self.batches) if self.batches else 0.0,
+                "embed_seconds_total": round(self.embed_seconds, 6),
+                "pending": self._queue.qsize(),
+                # non-cumulative: batches whose size is <= bound and > previous bound
+                "batch_size_histogram": dict(zip(labels, self.histogram)),
+            }
@@ -0,0 +1,317 @@
+# embedding_service.py
+# Host-local embedding sidecar for multi-worker deployments. One process owns the
+# model and serves every uvicorn worker over a Unix socket, so the host holds one
+# copy of the model and requests from all workers share batches (EmbeddingBatcher).
+#
+#   python embedding_service.py --socket /tmp/nitai-embeddings.sock
+#   EMBEDDING_SERVICE_SOCKET=/tmp/nitai-embeddings.sock uvicorn main:app --workers 8
+#
+# Wire format: every message is a 4-byte big-endian length followed by the payload.
+# Requests are JSON ({"op": "embed", "texts": [...]}, {"op": "ping"}, {"op": "stats"}).
+# Replies are a JSON header; an embed reply is followed by one more frame holding
+# count x dim float32 values.
+import os
+import json
+import time
+import socket
+import signal
+import struct
+import argparse
+import threading
+import socketserver
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from embedding_batcher import EmbeddingBatcher
+from embedding_backends import SUPPORTED_BACKENDS, embedding_model_id, load_embeddings
+
+DEFAULT_SOCKET = "/tmp/nitai-embeddings.sock"
+
+_LENGTH = struct.Struct(">I")
+# Guards against a corrupt length prefix making us allocate gigabytes
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class EmbeddingServiceUnavailable(Exception):
+    """The sidecar could not be reached or failed; callers should embed in-process."""
+
+
+def _send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        read = sock.recv_into(view[got:], n - got)
+        if read == 0:
+            raise ConnectionError("connection closed")
+        got += read
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    if length > MAX_FRAME_BYTES:
+        raise ConnectionError(f"frame of {length} bytes exceeds the limit")
+    return _recv_exact(sock, length)
+
+
+# --- Server ---
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: "EmbeddingServer" = self.server
+        while True:
+            try:
+                request = json.loads(_recv_frame(self.request))
+            except (ConnectionError, OSError, ValueError):
+                return
+            if server.closing:
+                return  # hang up; the client marks the service down and falls back
+            op = request.get("op", "embed")
+            try:
+                if op == "embed":
+                    vectors = np.asarray(server.batcher.embed_many(request.get("texts") or []), dtype=np.float32)
+                    count, dim = (vectors.shape if vectors.ndim == 2 else (0, 0))
+                    _send_frame(self.request, json.dumps({"ok": True, "count": count, "dim": dim}).encode())
+                    _send_frame(self.request, vectors.tobytes())
+                elif op == "ping":
+                    _send_frame(self.request, json.dumps({"ok": True, "model": server.model_name, "pid": os.getpid()}).encode())
+                elif op == "stats":
+                    stats = {"model": server.model_name, "uptime_s": round(time.monotonic() - server.started, 1),
+                             **server.batcher.stats()}
+                    _send_frame(self.request, json.dumps({"ok": True, "stats": stats}).encode())
+                else:
+                    _send_frame(self.request, json.dumps({"ok": False, "error": f"unknown op {op!r}"}).encode())
+            except (ConnectionError, OSError):
+                return
+            except Exception as e:
+                print("Embedding request failed:", repr(e))
+                try:
+                    _send_frame(self.request, json.dumps({"ok": False, "error": repr(e)}).encode())
+                except OSError:
+                    return
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """One thread per worker connection; all of them feed a single EmbeddingBatcher."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embed_fn: Callable[[List[str]], Sequence[Sequence[float]]],
+                 model_name: str, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # stale socket from a previous run
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.started = time.monotonic()
+        self.closing = False
+        self.batcher = EmbeddingBatcher(embed_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        super().__init__(socket_path, _Handler)
+
+    def server_close(self):
+        self.closing = True
+        super().server_close()
+        self.batcher.close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+# --- Client ---
+class EmbeddingServiceClient:
+    """
+    Thread-safe client; each calling thread keeps its own connection. With `model_name`
+    set, every new connection pings the server first and is only used if it serves that
+    model (a restarted sidecar may have been started with another one). After a failure
+    or a model mismatch the service is treated as down for `retry_interval_s`, so callers
+    fall back immediately instead of paying a connect timeout on every request, and
+    check again afterwards.
+    """
+
+    def __init__(self, socket_path: str, timeout_s: float = 10.0, retry_interval_s: float = 5.0,
+                 model_name: Optional[str] = None):
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self.retry_interval_s = retry_interval_s
+        self.model_name = model_name
+        self._local = threading.local()
+        self._down_until = 0.0
+        self.server_model: Optional[str] = None  # model named by the last ping
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    @property
+    def model_matches(self) -> bool:
+        return self.model_name is None or self.server_model in (None, self.model_name)
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            try:
+                sock.connect(self.socket_path)
+                if self.model_name is not None:
+                    self._check_model(sock)
+            except BaseException:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _check_model(self, sock: socket.socket):
+        _send_frame(sock, json.dumps({"op": "ping"}).encode())
+        header = json.loads(_recv_frame(sock))
+        model = header.get("model")
+        if model == self.model_name and self.server_model != model:
+            print(f"Using embedding service at {self.socket_path} (pid {header.get('pid')}).")
+        self.server_model = model
+        if model != self.model_name:
+            # vectors from another model would not match the index
+            raise EmbeddingServiceUnavailable(f"embedding service serves {model!r}, expected {self.model_name!r}")
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _mark_down(self):
+        self.failures += 1
+        self._down_until = time.monotonic() + self.retry_interval_s
+
+    def _call(self, request: dict, expect_vectors: bool = False):
+        if not self.available:
+            raise EmbeddingServiceUnavailable(f"embedding service at {self.socket_path} marked down")
+        self.requests += 1
+        try:
+            sock = self._connection()
+            _send_frame(sock, json.dumps(request).encode())
+            header = json.loads(_recv_frame(sock))
+            payload = _recv_frame(sock) if expect_vectors and header.get("ok") else None
+        except EmbeddingServiceUnavailable:
+            self._mark_down()  # wrong model: check the next connection after the retry interval
+            raise
+        except (OSError, ConnectionError, ValueError) as e:
+            # a half-read reply leaves the stream out of sync, so never reuse the socket
+            self._drop_connection()
+            self._mark_down()
+            raise EmbeddingServiceUnavailable(repr(e)) from e
+        if not header.get("ok"):
+            self.failures += 1
+            raise EmbeddingServiceUnavailable(header.get("error") or "embedding service error")
+        if expect_vectors:
+            vectors = np.frombuffer(payload, dtype=np.float32)
+            return vectors.reshape(header["count"], header["dim"]) if header["count"] else vectors.reshape(0, 0)
+        return header
+
+    def ping(self) -> dict:
+        return self._call({"op": "ping"})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._call({"op": "embed", "texts": list(texts)}, expect_vectors=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def remote_stats(self) -> Optional[dict]:
+        try:
+            return self._call({"op": "stats"})["stats"]
+        except EmbeddingServiceUnavailable:
+            return None
+
+    def stats(self) -> dict:
+        return {"socket": self.socket_path, "available": self.available, "model_matches": self.model_matches,
+                "requests": self.requests, "failures": self.failures}
+
+
+class ServiceEmbeddings:
+    """
+    Embeddings object for main.py: uses the sidecar while it is up (and serves the
+    client's model) and falls back to an in-process model, loaded by `load_local` on
+    first need, while it is not.
+    """
+
+    def __init__(self, client: EmbeddingServiceClient, load_local: Callable[[], object]):
+        self.client = client
+        self._load_local = load_local
+        self._local = None
+        self._local_lock = threading.Lock()
+        self.fallbacks = 0
+        try:
+            client.ping()
+        except EmbeddingServiceUnavailable as e:
+            print(f"Embedding service at {client.socket_path} unavailable, embedding in-process:", e)
+
+    @property
+    def local(self):
+        if self._local is None:
+            with self._local_lock:
+                if self._local is None:
+                    self._local = self._load_local()
+        return self._local
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.client.available:
+            try:
+                return self.client.embed_documents(texts)
+            except EmbeddingServiceUnavailable as e:
+                print("Embedding service unavailable, embedding in-process:", e)
+        self.fallbacks += 1
+        return self.local.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        return {**self.client.stats(), "fallbacks": self.fallbacks, "local_model_loaded": self._local is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve query/document embeddings to local API workers over a Unix socket.")
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVICE_SOCKET") or DEFAULT_SOCKET)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"))
+    parser.add_argument("--device", default=os.getenv("EMBEDDING_DEVICE", "cpu"))
+    parser.add_argument("--backend", choices=SUPPORTED_BACKENDS, default=os.getenv("EMBEDDING_BACKEND", "huggingface").lower())
+    parser.add_argument("--onnx-dir", default=os.getenv("ONNX_MODEL_DIR") or None)
+    parser.add_argument("--quantized", action="store_true", default=os.getenv("ONNX_QUANTIZED", "0") == "1",
+                        help="Use the int8 ONNX graph (--backend onnx).")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("ONNX_THREADS", "0")))
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # workers compare this with their own configuration before using the service
+    model_id = embedding_model_id(args.model, args.backend, args.quantized)
+    print(f"Loading embedding model '{model_id}' ({args.backend}) on {args.device}...")
+    model = load_embeddings(args.model, args.backend, device=args.device, onnx_dir=args.onnx_dir,
+                            quantized=args.quantized, threads=args.threads)
+    model.embed_documents(["warm-up query"])
+
+    server = EmbeddingServer(args.socket, model.embed_documents, model_id,
+                             max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    # SIGTERM from a process manager: stop serving and remove the socket file
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"Embedding service listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Embedding service stopped.")
+
+
+if __name__ == "__main__":
+    main()
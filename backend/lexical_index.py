@@ -0,0 +1,204 @@
+# lexical_index.py
+# Prebuilt BM25 inverted index over the same chunks as the vector DB, fused with
+# vector results for hybrid retrieval (HYBRID_RETRIEVAL=1). Exact tokens such as
+# course codes ("MA101"), room numbers and notice titles are what MiniLM misses.
+#
+# Layout of an index directory (all arrays memory-mapped on load):
+#   lexical.json       count, avgdl, BM25 parameters
+#   vocab.json         term -> term id
+#   term_offsets.npy   (V + 1,) uint64 start of each term's postings
+#   postings_doc.npy   (P,) uint32 chunk row
+#   postings_tf.npy    (P,) uint16 term frequency in that chunk
+#   idf.npy            (V,) float32
+#   doc_lens.npy       (N,) float32 chunk length in tokens
+#   chunks.jsonl + chunk_offsets.npy   chunk text/metadata (see vector_index.ChunkStore)
+#   filters.json + filter_<field>.npy   filterable metadata columns (metadata_filters.FilterColumns)
+import os
+import re
+import json
+import shutil
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metadata_filters import FilterColumns
+from vector_index import ChunkStore, ChunkStoreWriter, IndexedChunk, ReloadingIndex, swap_directory, top_k
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# "ma101" -> also "ma", "101", so "MA 101" and "MA101" match each other
+_ALNUM_SPLIT_RE = re.compile(r"[a-z]+|[0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with what when where which who how i you me my our we do does did can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if tok in STOPWORDS:
+            continue
+        tokens.append(tok)
+        parts = _ALNUM_SPLIT_RE.findall(tok)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def build_lexical_index(path: str, records: Iterable[Tuple[str, str, dict]], k1: float = BM25_K1, b: float = BM25_B) -> int:
+    """
+    Build a BM25 index at `path` from (chunk id, text, metadata) records.
+    Written to `<path>.tmp` and swapped into place. Returns the number of chunks.
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    # Chunk texts are streamed to disk; only postings are kept in memory
+    chunks = ChunkStoreWriter(tmp_path)
+    filters = FilterColumns()
+    postings = defaultdict(list)  # term -> [(row, tf)]
+    doc_lens = []
+    for row, (chunk_id, text, metadata) in enumerate(records):
+        chunks.add(chunk_id, text, metadata)
+        filters.add(metadata)
+        counts = Counter(tokenize(text))
+        doc_lens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append((row, min(tf, 65535)))
+    chunks.close()
+    filters.save(tmp_path)
+
+    n = len(doc_lens)
+    vocab = {term: i for i, term in enumerate(sorted(postings))}
+    term_offsets = np.zeros(len(vocab) + 1, dtype=np.uint64)
+    total = sum(len(p) for p in postings.values())
+    postings_doc = np.empty(total, dtype=np.uint32)
+    postings_tf = np.empty(total, dtype=np.uint16)
+    idf = np.empty(len(vocab), dtype=np.float32)
+    pos = 0
+    for term, i in vocab.items():
+        plist = postings[term]
+        term_offsets[i] = pos
+        postings_doc[pos:pos + len(plist)] = [r for r, _ in plist]
+        postings_tf[pos:pos + len(plist)] = [tf for _, tf in plist]
+        df = len(plist)
+        idf[i] = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        pos += len(plist)
+    term_offsets[len(vocab)] = pos
+
+    np.save(os.path.join(tmp_path, "term_offsets.npy"), term_offsets)
+    np.save(os.path.join(tmp_path, "postings_doc.npy"), postings_doc)
+    np.save(os.path.join(tmp_path, "postings_tf.npy"), postings_tf)
+    np.save(os.path.join(tmp_path, "idf.npy"), idf)
+    np.save(os.path.join(tmp_path, "doc_lens.npy"), np.asarray(doc_lens, dtype=np.float32))
+    with open(os.path.join(tmp_path, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False, separators=(",", ":"))
+    # written last: its presence/mtime is what readers check
+    with open(os.path.join(tmp_path, "lexical.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": n, "terms": len(vocab), "postings": total,
+                   "avgdl": (sum(doc_lens) / n) if n else 0.0, "k1": k1, "b": b}, f)
+
+    swap_directory(tmp_path, path)
+    return n
+
+
+class LexicalIndex(ReloadingIndex):
+    """BM25 search over a prebuilt inverted index."""
+
+    stamp_file = "lexical.json"
+
+    def _load(self):
+        def load(name):
+            return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+        with open(os.path.join(self.path, "lexical.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        with open(os.path.join(self.path, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        doc_lens = np.asarray(load("doc_lens.npy"), dtype=np.float32)
+        avgdl = info["avgdl"] or 1.0
+        # BM25 length normalization depends only on the chunk, so precompute it
+        norm = info["k1"] * (1.0 - info["b"] + info["b"] * doc_lens / avgdl)
+        self._state = {
+            "info": info,
+            "vocab": vocab,
+            "term_offsets": load("term_offsets.npy"),
+            "postings_doc": load("postings_doc.npy"),
+            "postings_tf": load("postings_tf.npy"),
+            "idf": load("idf.npy"),
+            "norm": norm.astype(np.float32),
+            "chunks": ChunkStore(self.path),
+            "filters": FilterColumns.load(self.path),
+        }
+        print(f"Loaded lexical index from '{self.path}' ({info['count']} chunks, {info['terms']} terms).")
+
+    def __len__(self):
+        return int(self._state["info"]["count"])
+
+    def search(self, query: str, k: int = 4, filters: Optional[dict] = None) -> List[IndexedChunk]:
+        """BM25 top-k; normalized `filters` restrict the result to matching chunks."""
+        self._maybe_reload()
+        st = self._state
+        n = st["info"]["count"]
+        if n == 0:
+            return []
+        allowed = self._filter_columns(st).mask(filters) if filters else None
+        if allowed is not None and not allowed.any():
+            return []
+        k1 = st["info"]["k1"]
+        scores = np.zeros(n, dtype=np.float32)
+        matched = False
+        for term, qtf in Counter(tokenize(query)).items():
+            tid = st["vocab"].get(term)
+            if tid is None:
+                continue
+            matched = True
+            start, end = int(st["term_offsets"][tid]), int(st["term_offsets"][tid + 1])
+            rows = np.asarray(st["postings_doc"][start:end], dtype=np.int64)
+            tf = np.asarray(st["postings_tf"][start:end], dtype=np.float32)
+            # each row appears once per term, so plain fancy-index += is safe
+            scores[rows] += qtf * st["idf"][tid] * tf * (k1 + 1.0) / (tf + st["norm"][rows])
+        if not matched:
+            return []
+        if allowed is not None:
+            scores[~allowed] = 0.0
+        results = []
+        for row in top_k(scores, k):
+            if scores[row] <= 0:
+                break
+            record = st["chunks"].get(int(row))
+            results.append(IndexedChunk(record["id"], record["text"], record.get("metadata") or {}, float(scores[row])))
+        return results
+
+    def stats(self) -> dict:
+        return {"path": self.path, **self._state["info"]}
+
+
+def _doc_key(doc) -> Tuple[str, str]:
+    # Chroma's LangChain Documents may not carry the chunk id, so key on source + text
+    meta = getattr(doc, "metadata", {}) or {}
+    return (meta.get("source_file") or meta.get("source") or "", getattr(doc, "page_content", "") or "")
+
+
+def reciprocal_rank_fusion(vector_docs: Sequence, lexical_docs: Sequence, k: int,
+                           lexical_weight: float = 0.5, rrf_k: int = 60) -> list:
+    """
+    Weighted reciprocal rank fusion: score = (1 - w) / (rrf_k + vector rank)
+    + w / (rrf_k + lexical rank). w = 0 is pure vector, w = 1 is pure lexical.
+    """
+    scores = {}
+    docs = {}
+    for weight, ranked in ((1.0 - lexical_weight, vector_docs), (lexical_weight, lexical_docs)):
+        for rank, doc in enumerate(ranked, start=1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+    ranked_keys = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [docs[key] for key in ranked_keys[:k]]
@@ -0,0 +1,239 @@
+# llm_client.py
+# Native asyncio client for OpenAI-compatible /chat/completions endpoints.
+# Used when LLM_BACKEND=httpx: one pooled httpx.AsyncClient per process, a bounded
+# number of concurrent calls, and a bounded wait queue in front of it.
+import json
+import time
+import random
+import asyncio
+from typing import AsyncIterator, Optional
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when the wait queue is full; callers should shed load (e.g. HTTP 503)."""
+
+
+class LLMRequestError(RuntimeError):
+    """Raised when a completion fails after all retries."""
+
+
+# Status codes worth retrying: rate limits and transient server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        temperature: float = 0.0,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        timeout_s: float = 60.0,
+        max_retries: int = 3,
+        backoff_s: float = 0.5,
+        max_backoff_s: float = 8.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.timeout_s = timeout_s
+        self.max_retries = max(0, max_retries)
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+        self.request_seconds_total = 0.0
+
+    # --- lifecycle ---
+    def _ensure_client(self):
+        # created lazily so it binds to the running event loop
+        if self._client is None:
+            import httpx
+
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout_s, connect=min(10.0, self.timeout_s)),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    # --- concurrency control ---
+    async def _acquire(self):
+        self._ensure_client()
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError(
+                f"LLM client saturated: {self.in_flight} in flight, {self.waiting} waiting"
+            )
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - started
+        self.queue_wait_seconds_total += waited
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, waited)
+        self.in_flight += 1
+
+    def _release(self, started: float, ok: bool):
+        self.in_flight -= 1
+        self._semaphore.release()
+        self.request_seconds_total += time.perf_counter() - started
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff_s)
+            except ValueError:
+                pass
+        # "full jitter": uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.max_backoff_s, self.backoff_s * (2 ** attempt)))
+
+    def _payload(self, prompt_text: str, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt_text}],
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+
+    # --- public API ---
+    async def complete(self, prompt_text: str) -> str:
+        import httpx
+
+        await self._acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            last_error = None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                try:
+                    resp = await self._client.post("/chat/completions", json=self._payload(prompt_text, False))
+                except httpx.TransportError as e:  # includes timeouts
+                    last_error = e
+                    if attempt == self.max_retries:
+                        break  # no point sleeping (and holding a slot) before giving up
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                if resp.status_code in RETRYABLE_STATUS:
+                    last_error = LLMRequestError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+                    if attempt == self.max_retries:
+                        break
+                    await asyncio.sleep(self._backoff(attempt, resp.headers.get("Retry-After")))
+                    continue
+                if resp.status_code >= 400:
+                    raise LLMRequestError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+                data = resp.json()
+                choice = data["choices"][0]
+                content = (choice.get("message") or {}).get("content")
+                ok = True
+                return content if content is not None else choice.get("text", "")
+            raise LLMRequestError(f"LLM request failed after {self.max_retries + 1} attempts") from last_error
+        finally:
+            self._release(started, ok)
+
+    async def stream(self, prompt_text: str) -> AsyncIterator[str]:
+        """Yield completion text as it arrives. Retries only happen before the first token."""
+        import httpx
+
+        await self._acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            last_error = None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                produced = False
+                try:
+                    async with self._client.stream(
+                        "POST", "/chat/completions", json=self._payload(prompt_text, True)
+                    ) as resp:
+                        if resp.status_code in RETRYABLE_STATUS:
+                            body = await resp.aread()
+                            last_error = LLMRequestError(f"HTTP {resp.status_code}: {body[:200]!r}")
+                            if attempt == self.max_retries:
+                                break  # no point sleeping (and holding a slot) before giving up
+                            await asyncio.sleep(self._backoff(attempt, resp.headers.get("Retry-After")))
+                            continue
+                        if resp.status_code >= 400:
+                            body = await resp.aread()
+                            raise LLMRequestError(f"HTTP {resp.status_code}: {body[:200]!r}")
+                        async for line in resp.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            choices = json.loads(data).get("choices") or []
+                            if not choices:
+                                continue
+                            text = (choices[0].get("delta") or {}).get("content") or choices[0].get("text")
+                            if text:
+                                produced = True
+                                yield text
+                    ok = True
+                    return
+                except httpx.TransportError as e:
+                    if produced:
+                        raise
+                    last_error = e
+                    if attempt == self.max_retries:
+                        break
+                    await asyncio.sleep(self._backoff(attempt))
+            raise LLMRequestError(f"LLM stream failed after {self.max_retries + 1} attempts") from last_error
+        finally:
+            self._release(started, ok)
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "queue_wait_seconds_total": round(self.queue_wait_seconds_total, 6),
+            "queue_wait_seconds_max": round(self.queue_wait_seconds_max, 6),
+            "queue_wait_seconds_mean": round(self.queue_wait_seconds_total / finished, 6) if finished else 0.0,
+            "request_seconds_mean": round(self.request_seconds_total / finished, 6) if finished else 0.0,
+        }
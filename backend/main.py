@@ -1,13 +1,31 @@
 # main.py (lazy-import safe)
 import os
+import json
+import time
 import asyncio
-from typing import Optional, List
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional, List, Iterator, AsyncIterator, Tuple, Union
 
 from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from answer_cache import SemanticAnswerCache, directory_fingerprint, normalize_query
+from embedding_batcher import EmbeddingBatcher
+from embedding_service import EmbeddingServiceClient, ServiceEmbeddings
+from embedding_backends import embedding_model_id, load_embeddings
+from llm_client import AsyncLLMClient, LLMOverloadedError
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from context_builder import build_context, get_token_counter
+from metadata_filters import chroma_where, filters_key, normalize_filters
+from metrics import Metrics, MetricsMiddleware, bucket_lines, gauge_lines
+
 # Do NOT import langchain_community or langchain_core at module import time.
 # We'll lazy-import them inside initializer to avoid import-time failures.
 
@@ -16,74 +34,299 @@ load_dotenv()
 # ---- Configuration ----
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
 EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+# "huggingface" = sentence-transformers (PyTorch); "onnx" = onnxruntime export from scripts/export_onnx.py
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR") or None  # default: backend/models/<model>-onnx
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "0") == "1"  # int8 dynamic quantization
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = onnxruntime default
 PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIR", "db")
+# "chroma" = LangChain Chroma wrapper; "numpy" = memory-mapped index exported by build_vectordb.py --export-numpy
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma").lower()
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(PERSIST_DIRECTORY, "numpy_index"))
+# Hybrid retrieval: fuse BM25 hits from the index built by build_vectordb.py --export-lexical
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "0") == "1"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join(PERSIST_DIRECTORY, "lexical_index"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "0.5"))  # 0 = vector only, 1 = lexical only
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # hits taken from each retriever before fusion
 RETRIEVE_K = int(os.getenv("RETRIEVE_K", "4"))
+# Max prompt tokens spent on retrieved context after merging/dedup (0 = no cap)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0"))
+# "openai" = langchain_openai with openai SDK fallback (blocking, runs in the executor)
+# "httpx"  = native async client against OPENAI_BASE_URL (any OpenAI-compatible server)
+# "fake"   = canned local answer (tests/benchmarks)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BACKOFF_S = float(os.getenv("LLM_RETRY_BACKOFF_S", "0.5"))
+FAKE_LLM_RESPONSE = os.getenv("FAKE_LLM_RESPONSE", "This is a canned answer from the fake LLM.")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+# Semantic answer cache (keyed on the query embedding; a hit also needs the same codes/years, see answer_cache.exact_terms)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+# Cross-request micro-batching of query embeddings
+EMBED_BATCHING_ENABLED = os.getenv("EMBED_BATCHING_ENABLED", "1") == "1"
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+# /api/query/batch: max queries per request, and LLM calls in flight per batch
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# Shared embedding sidecar (embedding_service.py) for multi-worker hosts; empty = model in every worker
+EMBEDDING_SERVICE_SOCKET = os.getenv("EMBEDDING_SERVICE_SOCKET", "")
+EMBEDDING_SERVICE_TIMEOUT_S = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT_S", "10"))
+# Load the model, open Chroma and run a dummy embed + search at startup instead of on the first request.
+# With it off, the first /health/ready probe starts loading in the background (503 until loaded).
+# Either way a failed load or warm-up is retried by the next /health/ready probe.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+# Per-stage latency histograms on /metrics and a Server-Timing response header
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Write a sampled stack profile (folded format) of requests slower than this to PROFILE_DIR (0 = off)
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
 # ------------------------
 
+LLM_BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
+QUERY_ERROR_MESSAGE = "An error occurred while processing the request."
+
+VECTOR_DB_UNAVAILABLE_ANSWER = (
+    "Vector DB is not available on this server. Check logs for langchain_community/langsmith "
+    "compatibility or install required packages."
+)
+
+metrics = Metrics(
+    enabled=METRICS_ENABLED,
+    profile_slow_ms=PROFILE_SLOW_REQUEST_MS,
+    profile_interval_ms=PROFILE_INTERVAL_MS,
+    profile_dir=PROFILE_DIR,
+)
+
 # Placeholders to be initialized lazily
 embeddings = None
 vectordb = None
-retriever = None
+lexical_index = None
+_vectorstore_ready = False  # True once embeddings + vectordb (+ lexical index) are loaded
 
 _llm_instance = None  # langchain_openai wrapper instance cache
+_llm_initialized = False  # True once we've decided between the wrapper and the SDK fallback
 
+async_llm = AsyncLLMClient(
+    base_url=OPENAI_BASE_URL,
+    api_key=os.getenv("OPENAI_API_KEY"),
+    model=OPENAI_MODEL,
+    temperature=OPENAI_TEMPERATURE,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_MAX_QUEUE,
+    timeout_s=LLM_TIMEOUT_S,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_s=LLM_RETRY_BACKOFF_S,
+) if LLM_BACKEND == "httpx" else None
+
+embedding_batcher = EmbeddingBatcher(
+    lambda texts: embeddings.embed_documents(texts),
+    max_batch_size=EMBED_BATCH_MAX_SIZE,
+    max_wait_ms=EMBED_BATCH_WAIT_MS,
+) if EMBED_BATCHING_ENABLED else None
+
+# Concurrent first requests all land in the executor; these make sure each
+# component is loaded by exactly one thread while the others wait.
+_vectorstore_lock = threading.Lock()
+_llm_lock = threading.Lock()
+
+# Per-component readiness for /health/ready
+_component_status = {
+    name: {"ready": False, "load_seconds": None, "error": None}
+    for name in ("embeddings", "vectordb", "lexical", "llm", "warmup")
+}
+
+
+def _mark_component(name: str, started: float, error: Optional[Exception] = None):
+    status = _component_status[name]
+    status["load_seconds"] = round(time.perf_counter() - started, 4)
+    status["ready"] = error is None
+    status["error"] = repr(error) if error is not None else None
 
-# --- Lazy init for vectorstore & embeddings ---
-def init_vectorstore_and_embeddings():
-    global embeddings, vectordb, retriever
-    if retriever is not None:
-        return True
 
+def _index_fingerprint() -> tuple:
+    """Fingerprint of every index directory retrieval reads; cached answers are dropped when it changes."""
+    directories = [VECTOR_INDEX_DIR if RETRIEVAL_BACKEND == "numpy" else PERSIST_DIRECTORY]
+    if HYBRID_RETRIEVAL:
+        directories.append(LEXICAL_INDEX_DIR)
+    return tuple(directory_fingerprint(path) for path in directories)
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=ANSWER_CACHE_THRESHOLD,
+    ttl_s=ANSWER_CACHE_TTL_S,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    fingerprint_fn=_index_fingerprint,
+) if ANSWER_CACHE_ENABLED else None
+
+
+# --- Lazy init for vectorstore & embeddings ---
+def _init_lexical_index():
+    global lexical_index
+    started = time.perf_counter()
     try:
-        # Lazy imports (may raise if packages have incompatible deps)
-        from langchain_community.embeddings import HuggingFaceEmbeddings
-        from langchain_community.vectorstores import Chroma
+        lexical_index = LexicalIndex(LEXICAL_INDEX_DIR)
+        _mark_component("lexical", started)
     except Exception as e:
-        # Report a friendly error; do NOT raise raw to avoid crashing app import.
-        print("Could not import langchain_community vectorstore/embeddings:", repr(e))
-        print("If you need vector DB functionality, install compatible langchain_community/langchain_core/langsmith packages or use fallback storage.")
-        return False
+        # hybrid retrieval is an enhancement; fall back to vector-only search
+        _mark_component("lexical", started, e)
+        print("Lexical index unavailable, using vector-only retrieval:", repr(e))
 
-    try:
-        model_kwargs = {"device": EMBEDDING_DEVICE}
-        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME, model_kwargs=model_kwargs)
-        vectordb = Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=embeddings)
-        retriever = vectordb.as_retriever(search_kwargs={"k": RETRIEVE_K})
-        print("Vectorstore and embeddings initialized (Chroma + HuggingFace).")
+
+def init_vectorstore_and_embeddings():
+    global embeddings, vectordb, _vectorstore_ready
+    if _vectorstore_ready:
         return True
-    except Exception as e:
-        print("Error initializing Chroma/HuggingFaceEmbeddings:", repr(e))
-        return False
+
+    with _vectorstore_lock:
+        # another thread may have finished loading while we waited for the lock
+        if _vectorstore_ready:
+            return True
+
+        try:
+            # Lazy imports (may raise if packages have incompatible deps); the numpy index
+            # doesn't need the Chroma wrapper, and embedding_backends imports its own
+            if RETRIEVAL_BACKEND != "numpy":
+                from langchain_community.vectorstores import Chroma
+        except Exception as e:
+            # Report a friendly error; do NOT raise raw to avoid crashing app import.
+            print("Could not import langchain_community vectorstore/embeddings:", repr(e))
+            print("If you need vector DB functionality, install compatible langchain_community/langchain_core/langsmith packages or use fallback storage.")
+            _component_status["embeddings"]["error"] = repr(e)
+            return False
+
+        stage = "embeddings"
+        started = time.perf_counter()
+        try:
+            load_local = lambda: load_embeddings(
+                EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, device=EMBEDDING_DEVICE,
+                onnx_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, threads=ONNX_THREADS,
+            )
+            if EMBEDDING_SERVICE_SOCKET:
+                # the in-process model is only loaded if the service is (or goes) down
+                model_id = embedding_model_id(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, ONNX_QUANTIZED)
+                client = EmbeddingServiceClient(EMBEDDING_SERVICE_SOCKET, timeout_s=EMBEDDING_SERVICE_TIMEOUT_S,
+                                                model_name=model_id)
+                loaded_embeddings = ServiceEmbeddings(client, load_local)
+            else:
+                loaded_embeddings = load_local()
+            _mark_component("embeddings", started)
+
+            stage = "vectordb"
+            started = time.perf_counter()
+            if RETRIEVAL_BACKEND == "numpy":
+                from vector_index import NumpyVectorIndex
+
+                loaded_vectordb = NumpyVectorIndex(VECTOR_INDEX_DIR)
+            else:
+                loaded_vectordb = Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=loaded_embeddings)
+            _mark_component("vectordb", started)
+
+            if HYBRID_RETRIEVAL and lexical_index is None:
+                _init_lexical_index()
+
+            embeddings = loaded_embeddings
+            vectordb = loaded_vectordb
+            # set last: other threads read it without the lock (retrieval goes through _search_docs)
+            _vectorstore_ready = True
+            print(f"Vectorstore and embeddings initialized ({'numpy index' if RETRIEVAL_BACKEND == 'numpy' else 'Chroma'} + {EMBEDDING_BACKEND}).")
+            return True
+        except Exception as e:
+            _mark_component(stage, started, e)
+            print(f"Error initializing {stage}:", repr(e))
+            return False
+
+
+# --- Local fake LLM (LLM_BACKEND=fake) ---
+class _FakeLLM:
+    """
+    Deterministic stand-in for the LangChain chat model, used by tests and benchmarks.
+    Total latency is FAKE_LLM_LATENCY_MS, spread evenly across the streamed tokens.
+    """
+
+    def __init__(self, response: str, latency_ms: float = 0.0):
+        self.response = response
+        self.latency_s = max(latency_ms, 0.0) / 1000.0
+
+    def _tokens(self) -> List[str]:
+        words = self.response.split(" ")
+        return [w if i == len(words) - 1 else w + " " for i, w in enumerate(words)]
+
+    def predict(self, prompt_text: str) -> str:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self.response
+
+    def stream(self, prompt_text: str) -> Iterator[str]:
+        tokens = self._tokens()
+        delay = self.latency_s / len(tokens) if tokens else 0.0
+        for tok in tokens:
+            if delay:
+                time.sleep(delay)
+            yield tok
 
 
 # --- Lazy LLM init with langchain_openai fallback to openai SDK ---
 def _init_llm():
-    global _llm_instance
-    if _llm_instance is not None:
+    global _llm_instance, _llm_initialized
+    if _llm_initialized:
         return _llm_instance
-    try:
-        # try LangChain wrapper (lazy)
-        from langchain_openai import ChatOpenAI as LCChatOpenAI
-        _llm_instance = LCChatOpenAI(model_name=OPENAI_MODEL, temperature=OPENAI_TEMPERATURE)
-        print("Using langchain_openai.ChatOpenAI")
+
+    with _llm_lock:
+        if _llm_initialized:
+            return _llm_instance
+        started = time.perf_counter()
+        if LLM_BACKEND == "fake":
+            _llm_instance = _FakeLLM(FAKE_LLM_RESPONSE, FAKE_LLM_LATENCY_MS)
+            print("Using fake LLM (LLM_BACKEND=fake)")
+        else:
+            try:
+                # try LangChain wrapper (lazy)
+                from langchain_openai import ChatOpenAI as LCChatOpenAI
+                _llm_instance = LCChatOpenAI(model_name=OPENAI_MODEL, temperature=OPENAI_TEMPERATURE)
+                print("Using langchain_openai.ChatOpenAI")
+            except Exception as e:
+                print("langchain_openai not usable (falling back to openai SDK):", repr(e))
+                _llm_instance = None
+        # the SDK fallback is a valid configuration, so the LLM counts as ready either way
+        _mark_component("llm", started)
+        _llm_initialized = True
         return _llm_instance
-    except Exception as e:
-        print("langchain_openai not usable (falling back to openai SDK):", repr(e))
-        _llm_instance = None
-        return None
+
+
+def _llm_path(lc) -> str:
+    """Label for metrics: which client actually served the call."""
+    return "fake" if isinstance(lc, _FakeLLM) else "langchain"
 
 
 def _call_llm_with_prompt(prompt_text: str) -> str:
+    # the slow-request profiler samples this thread for the request while the call runs
+    with metrics.profiled():
+        return _invoke_llm(prompt_text)
+
+
+def _invoke_llm(prompt_text: str) -> str:
     # 1) Try LangChain wrapper
     lc = _init_llm()
     if lc is not None:
+        started = time.perf_counter()
         try:
-            return lc.predict(prompt_text)
+            answer = lc.predict(prompt_text)
+            metrics.record_llm(_llm_path(lc), time.perf_counter() - started)
+            return answer
         except Exception:
             try:
                 res = lc.__call__([{"role": "user", "content": prompt_text}])
+                metrics.record_llm(_llm_path(lc), time.perf_counter() - started)
                 if hasattr(res, "text"):
                     return res.text
                 if hasattr(res, "generations"):
@@ -95,10 +338,12 @@ def _call_llm_with_prompt(prompt_text: str) -> str:
                         pass
                 return str(res)
             except Exception as e:
+                metrics.record_llm(_llm_path(lc), time.perf_counter() - started, ok=False)
                 print("LangChain wrapper call failed, will fallback to OpenAI SDK:", repr(e))
                 # fall through to SDK
 
     # 2) Fallback: openai SDK
+    started = time.perf_counter()
     try:
         import openai
 
@@ -108,6 +353,7 @@ def _call_llm_with_prompt(prompt_text: str) -> str:
 
         messages = [{"role": "user", "content": prompt_text}]
         completion = openai.ChatCompletion.create(model=OPENAI_MODEL, messages=messages, temperature=OPENAI_TEMPERATURE)
+        metrics.record_llm("sdk", time.perf_counter() - started)
         if completion and getattr(completion, "choices", None):
             choice = completion.choices[0]
             # modern shape: choice.message.content
@@ -125,45 +371,94 @@ def _call_llm_with_prompt(prompt_text: str) -> str:
                 return choice.text
         return str(completion)
     except Exception as e:
+        metrics.record_llm("sdk", time.perf_counter() - started, ok=False)
         raise RuntimeError("LLM invocation failed (both langchain wrapper and openai SDK). Check OPENAI_API_KEY and packages.") from e
 
 
-# --- Retrieval + answer helper ---
-def answer_with_retrieval(query: str, k: int = RETRIEVE_K) -> dict:
+def _field(obj, name):
+    """Read `name` from either a dict-shaped or attribute-shaped SDK object."""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _profiled_iter(iterable) -> Iterator:
     """
-    Attempt to initialize vectorstore lazily and answer the query.
-    If vectorstore is unavailable, returns an informative error message.
+    Iterate with every step visible to the slow-request profiler. Starlette may run
+    each step of a streamed response on a different pool thread, so register per step.
     """
-    ok = init_vectorstore_and_embeddings()
-    if not ok or retriever is None:
-        # Vector DB not available — return a helpful response
-        return {
-            "answer": "Vector DB is not available on this server. Check logs for langchain_community/langsmith compatibility or install required packages.",
-            "sources": [],
-        }
+    iterator = iter(iterable)
+    while True:
+        with metrics.profiled():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _stream_llm_with_prompt(prompt_text: str) -> Iterator[str]:
+    """
+    Yield the completion for `prompt_text` piece by piece.
+    Mirrors _call_llm_with_prompt: LangChain wrapper first, openai SDK as fallback.
+    The fallback is only used if the wrapper fails before producing any text.
+    """
+    # 1) Try LangChain wrapper
+    lc = _init_llm()
+    if lc is not None:
+        produced = False
+        started = time.perf_counter()
+        try:
+            for chunk in _profiled_iter(lc.stream(prompt_text)):
+                text = chunk if isinstance(chunk, str) else (getattr(chunk, "content", None) or "")
+                if text:
+                    if not produced:
+                        metrics.record_first_token(_llm_path(lc), time.perf_counter() - started)
+                    produced = True
+                    yield text
+            metrics.record_llm(_llm_path(lc), time.perf_counter() - started)
+            return
+        except Exception as e:
+            metrics.record_llm(_llm_path(lc), time.perf_counter() - started, ok=False)
+            if produced:
+                raise
+            print("LangChain wrapper stream failed, will fallback to OpenAI SDK:", repr(e))
 
-    # ensure k
+    # 2) Fallback: openai SDK with stream=True
+    started = time.perf_counter()
     try:
-        retriever.search_kwargs = {"k": k}
-    except Exception:
-        pass
+        import openai
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if api_key:
+            openai.api_key = api_key
 
-    docs = retriever.get_relevant_documents(query)
+        messages = [{"role": "user", "content": prompt_text}]
+        stream = openai.ChatCompletion.create(
+            model=OPENAI_MODEL, messages=messages, temperature=OPENAI_TEMPERATURE, stream=True
+        )
+    except Exception as e:
+        metrics.record_llm("sdk", time.perf_counter() - started, ok=False)
+        raise RuntimeError("LLM invocation failed (both langchain wrapper and openai SDK). Check OPENAI_API_KEY and packages.") from e
 
-    context_pieces: List[str] = []
-    sources: List[str] = []
-    for d in docs:
-        text = getattr(d, "page_content", None) or getattr(d, "text", None) or ""
+    produced = False
+    for chunk in _profiled_iter(stream):
+        choices = _field(chunk, "choices")
+        if not choices:
+            continue
+        delta = _field(choices[0], "delta")
+        text = _field(delta, "content") if delta is not None else _field(choices[0], "text")
         if text:
-            context_pieces.append(text)
-        meta = getattr(d, "metadata", {}) or {}
-        source = meta.get("source") or meta.get("file") or meta.get("source_id") or None
-        if source:
-            sources.append(source)
+            if not produced:
+                produced = True
+                metrics.record_first_token("sdk", time.perf_counter() - started)
+            yield text
+    metrics.record_llm("sdk", time.perf_counter() - started)
 
-    context = "\n\n".join(context_pieces) if context_pieces else "(no context found)"
 
-    prompt = (
+# --- Retrieval + answer helpers ---
+def _build_prompt(context: str, query: str) -> str:
+    return (
         "You are an expert assistant for the National Institute of Technology, Agartala.\n"
         "Use the following pieces of retrieved context to answer the question concisely.\n"
         "If the answer is not present in the context, say that you don't know.\n\n"
@@ -173,12 +468,411 @@ def answer_with_retrieval(query: str, k: int = RETRIEVE_K) -> dict:
         "Answer:"
     )
 
-    answer_text = _call_llm_with_prompt(prompt)
-    return {"answer": answer_text, "sources": sources}
+
+def embed_query(query: str) -> List[float]:
+    with metrics.timed("embed"):
+        if embedding_batcher is not None:
+            return embedding_batcher.embed(query)
+        return embeddings.embed_query(query)
+
+
+def _cache_lookup(query: str, query_vector: List[float], filters: Optional[dict] = None) -> Optional[dict]:
+    with metrics.timed("cache"):
+        return answer_cache.get(query_vector, filters_key(filters), query)
+
+
+def _run_in_executor(fn, *args):
+    """loop.run_in_executor that carries the request's context (stage timings) into the worker thread."""
+    return asyncio.get_running_loop().run_in_executor(None, contextvars.copy_context().run, fn, *args)
+
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """One embedding call for a whole batch of queries (the micro-batcher is for single requests)."""
+    with metrics.timed("embed"):
+        return embeddings.embed_documents(list(queries))
+
+
+def _chroma_search_by_vectors(query_vectors: List[List[float]], k: int, where: Optional[dict] = None) -> List[list]:
+    """
+    similarity_search_by_vector for several queries in one Chroma query call (the
+    LangChain wrapper only searches one vector at a time). Same Documents as the wrapper.
+    """
+    from langchain_core.documents import Document
+
+    results = vectordb._collection.query(
+        query_embeddings=[list(v) for v in query_vectors],
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas"],
+    )
+    return [
+        [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        for texts, metadatas in zip(results["documents"], results["metadatas"])
+    ]
+
+
+def _search_docs(queries: List[str], query_vectors: List[List[float]], k: int,
+                 filters: Optional[dict] = None) -> List[list]:
+    """
+    Ranked docs per query; all queries are searched in one call on either backend.
+    `filters` (normalized, see metadata_filters) restrict the search to matching chunks
+    before scoring: a `where` clause for Chroma, a row mask for the numpy/lexical indexes.
+    """
+    candidates = max(k, HYBRID_CANDIDATES) if lexical_index is not None else k
+    with metrics.timed("search", RETRIEVAL_BACKEND):
+        if RETRIEVAL_BACKEND == "numpy":
+            vector_hits = vectordb.similarity_search_by_vectors(query_vectors, k=candidates, filter=filters)
+        else:
+            vector_hits = _chroma_search_by_vectors(query_vectors, candidates, chroma_where(filters))
+    if lexical_index is None:
+        return vector_hits
+
+    results = []
+    for query, vector_docs in zip(queries, vector_hits):
+        with metrics.timed("lexical"):
+            lexical_docs = lexical_index.search(query, candidates, filters)
+        results.append(reciprocal_rank_fusion(vector_docs, lexical_docs, k, HYBRID_LEXICAL_WEIGHT))
+    return results
+
+
+def _prompt_from_docs(query: str, docs: list) -> dict:
+    # Merge overlapping neighbours, drop near-duplicates, cap at CONTEXT_TOKEN_BUDGET
+    with metrics.timed("prompt"):
+        context, sources, stats = build_context(docs, CONTEXT_TOKEN_BUDGET, get_token_counter(OPENAI_MODEL))
+    if stats["chunks"]:
+        print(
+            f"Context: {stats['chunks']} chunks -> {stats['blocks']} blocks "
+            f"({stats['merged']} merged, {stats['duplicates']} near-duplicates, {stats['truncated']} truncated); "
+            f"{stats['tokens_before']} -> {stats['tokens_after']} tokens, {stats['tokens_saved']} saved"
+        )
+
+    context = context or "(no context found)"
+    return {"prompt": _build_prompt(context, query), "sources": sources}
+
+
+def retrieve_context(query: str, k: int = RETRIEVE_K, query_vector: Optional[List[float]] = None,
+                     filters: Optional[dict] = None) -> Optional[dict]:
+    """
+    Run retrieval for `query` and build the LLM prompt.
+    Pass `query_vector` to reuse an embedding the caller already computed, and
+    normalized metadata `filters` to search only matching chunks.
+    Returns {"prompt": str, "sources": [str]} or None if the vector DB is unavailable.
+    """
+    if not init_vectorstore_and_embeddings():
+        return None
+
+    if query_vector is None:
+        query_vector = embed_query(query)
+    docs = _search_docs([query], [query_vector], k, filters)[0]
+    return _prompt_from_docs(query, docs)
+
+
+def _answer_uncached(query: str, k: int, query_vector: Optional[List[float]] = None,
+                     filters: Optional[dict] = None) -> dict:
+    retrieved = retrieve_context(query, k, query_vector, filters)
+    if retrieved is None:
+        # Vector DB not available — return a helpful response
+        return {"answer": VECTOR_DB_UNAVAILABLE_ANSWER, "sources": []}
+
+    answer_text = _call_llm_with_prompt(retrieved["prompt"])
+    result = {"answer": answer_text, "sources": retrieved["sources"]}
+    if answer_cache is not None and query_vector is not None:
+        answer_cache.put(query_vector, result, filters_key(filters), query)
+    return result
+
+
+def answer_with_retrieval(query: str, k: int = RETRIEVE_K, filters: Optional[dict] = None) -> dict:
+    """
+    Attempt to initialize vectorstore lazily and answer the query.
+    If vectorstore is unavailable, returns an informative error message.
+    With the answer cache enabled, semantically equivalent queries are served from
+    the cache and identical in-flight queries share a single LLM call.
+    """
+    if answer_cache is None or not init_vectorstore_and_embeddings():
+        return _answer_uncached(query, k, filters=filters)
+
+    query_vector = embed_query(query)
+    cached = _cache_lookup(query, query_vector, filters)
+    if cached is not None:
+        return cached
+    return answer_cache.single_flight(query, lambda: _answer_uncached(query, k, query_vector, filters),
+                                      filters_key(filters))
+
+
+async def _complete_async(prompt_text: str) -> str:
+    started = time.perf_counter()
+    try:
+        with metrics.profiled():  # sampled as the awaiting coroutine chain while suspended
+            answer_text = await async_llm.complete(prompt_text)
+    except Exception:
+        metrics.record_llm("httpx", time.perf_counter() - started, ok=False)
+        raise
+    metrics.record_llm("httpx", time.perf_counter() - started)
+    return answer_text
+
+
+async def answer_with_retrieval_async(query: str, k: int = RETRIEVE_K, filters: Optional[dict] = None) -> dict:
+    """
+    answer_with_retrieval for LLM_BACKEND=httpx. Embedding and search still run in
+    the executor, but the LLM call is awaited on the event loop, so requests waiting
+    on the API hold no thread and concurrency is bounded by the client instead.
+    """
+    if not await _run_in_executor(init_vectorstore_and_embeddings):
+        return {"answer": VECTOR_DB_UNAVAILABLE_ANSWER, "sources": []}
+
+    query_vector = await _run_in_executor(embed_query, query)
+    if answer_cache is not None:
+        cached = _cache_lookup(query, query_vector, filters)
+        if cached is not None:
+            return cached
+
+    async def compute() -> dict:
+        retrieved = await _run_in_executor(retrieve_context, query, k, query_vector, filters)
+        if retrieved is None:
+            return {"answer": VECTOR_DB_UNAVAILABLE_ANSWER, "sources": []}
+        answer_text = await _complete_async(retrieved["prompt"])
+        result = {"answer": answer_text, "sources": retrieved["sources"]}
+        if answer_cache is not None:
+            answer_cache.put(query_vector, result, filters_key(filters), query)
+        return result
+
+    if answer_cache is None:
+        return await compute()
+    return await answer_cache.async_single_flight(query, compute, filters_key(filters))
+
+
+def _prepare_batch(queries: List[str], k: int, filters: Optional[dict] = None) -> List[dict]:
+    """
+    Executor half of answer_batch: one embedding call for every query, cache lookups,
+    then retrieval for the misses. Each entry holds a finished "result" (cache hit),
+    a "retrieved" prompt for the LLM, or an "error".
+    """
+    vectors = embed_queries(queries)
+    entries = [{"vector": vector} for vector in vectors]
+    pending = []
+    for i, entry in enumerate(entries):
+        cached = _cache_lookup(queries[i], entry["vector"], filters) if answer_cache is not None else None
+        if cached is not None:
+            entry["result"] = cached
+        else:
+            pending.append(i)
+    if not pending:
+        return entries
+
+    hits = _search_docs([queries[i] for i in pending], [vectors[i] for i in pending], k, filters)
+    for i, docs in zip(pending, hits):
+        try:
+            entries[i]["retrieved"] = _prompt_from_docs(queries[i], docs)
+        except Exception as e:
+            print(f"Error building prompt for batch query {queries[i]!r}:", repr(e))
+            entries[i]["error"] = QUERY_ERROR_MESSAGE
+    return entries
+
+
+async def answer_batch(queries: List[str], k: int = RETRIEVE_K,
+                       filters: Optional[dict] = None) -> AsyncIterator[Tuple[int, dict]]:
+    """
+    Answer many queries together, yielding (index, result) as each one finishes.
+    `result` is {"answer", "sources"} or {"error"}. Queries that are identical after
+    normalization are answered once; LLM calls run at most BATCH_LLM_CONCURRENCY at a time.
+    `filters` apply to every query in the batch.
+    """
+    if not await _run_in_executor(init_vectorstore_and_embeddings):
+        for i in range(len(queries)):
+            yield i, {"answer": VECTOR_DB_UNAVAILABLE_ANSWER, "sources": []}
+        return
+
+    groups = {}  # normalized query -> indexes into `queries`
+    for i, query in enumerate(queries):
+        groups.setdefault(normalize_query(query), []).append(i)
+    members = list(groups.values())
+    unique = [queries[indexes[0]] for indexes in members]
+
+    try:
+        entries = await _run_in_executor(_prepare_batch, unique, k, filters)
+    except Exception as e:
+        print("Error retrieving batch:", repr(e))
+        for i in range(len(queries)):
+            yield i, {"error": QUERY_ERROR_MESSAGE}
+        return
+
+    semaphore = asyncio.Semaphore(max(1, BATCH_LLM_CONCURRENCY))
+
+    async def finish(pos: int) -> Tuple[int, dict]:
+        entry = entries[pos]
+        if "result" in entry:
+            return pos, entry["result"]
+        if "error" in entry:
+            return pos, {"error": entry["error"]}
+        prompt = entry["retrieved"]["prompt"]
+        async with semaphore:
+            try:
+                if async_llm is not None:
+                    answer_text = await _complete_async(prompt)
+                else:
+                    answer_text = await _run_in_executor(_call_llm_with_prompt, prompt)
+            except LLMOverloadedError:
+                return pos, {"error": LLM_BUSY_MESSAGE}
+            except Exception as e:
+                print(f"Error answering batch query {unique[pos]!r}:", repr(e))
+                return pos, {"error": QUERY_ERROR_MESSAGE}
+        result = {"answer": answer_text, "sources": entry["retrieved"]["sources"]}
+        if answer_cache is not None:
+            answer_cache.put(entry["vector"], result, filters_key(filters), unique[pos])
+        return pos, result
+
+    tasks = [asyncio.ensure_future(finish(pos)) for pos in range(len(unique))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            pos, result = await next_done
+            for i in members[pos]:
+                yield i, result
+    finally:
+        # the client went away mid-stream: don't keep calling the LLM for nobody
+        for task in tasks:
+            task.cancel()
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sources_event(sources: List[str]) -> str:
+    return _sse_event("sources", {"sources": sources, "source": sources[0] if sources else "No source found"})
+
+
+def _complete_answer_events(answer: str, sources: List[str]) -> List[str]:
+    """Events for an answer that is already complete (cache hit, vector DB unavailable)."""
+    return [_sources_event(sources), _sse_event("token", {"text": answer}), _sse_event("done", {})]
+
+
+def stream_answer_events(query: str, k: int = RETRIEVE_K, filters: Optional[dict] = None) -> Iterator[str]:
+    """
+    Server-sent events for /api/query/stream:
+      event: sources -> {"sources": [...], "source": first source}
+      event: token   -> {"text": "..."}   (repeated)
+      event: done    -> {}
+      event: error   -> {"message": "..."} (terminates the stream)
+    Sources are sent as soon as retrieval finishes, before the LLM is called.
+    """
+    try:
+        query_vector = None
+        if answer_cache is not None and init_vectorstore_and_embeddings():
+            query_vector = embed_query(query)
+            cached = _cache_lookup(query, query_vector, filters)
+            if cached is not None:
+                yield from _complete_answer_events(cached.get("answer", ""), cached.get("sources", []))
+                return
+
+        retrieved = retrieve_context(query, k, query_vector, filters)
+        if retrieved is None:
+            yield from _complete_answer_events(VECTOR_DB_UNAVAILABLE_ANSWER, [])
+            return
+
+        sources = retrieved["sources"]
+        yield _sources_event(sources)
+        pieces: List[str] = []
+        for text in _stream_llm_with_prompt(retrieved["prompt"]):
+            pieces.append(text)
+            yield _sse_event("token", {"text": text})
+        if answer_cache is not None and query_vector is not None:
+            answer_cache.put(query_vector, {"answer": "".join(pieces), "sources": sources}, filters_key(filters), query)
+        yield _sse_event("done", {})
+    except Exception as e:
+        print("Error streaming query:", repr(e))
+        yield _sse_event("error", {"message": QUERY_ERROR_MESSAGE})
+
+
+async def stream_answer_events_async(query: str, k: int = RETRIEVE_K, filters: Optional[dict] = None) -> AsyncIterator[str]:
+    """stream_answer_events for LLM_BACKEND=httpx; same event protocol."""
+    try:
+        if not await _run_in_executor(init_vectorstore_and_embeddings):
+            for event in _complete_answer_events(VECTOR_DB_UNAVAILABLE_ANSWER, []):
+                yield event
+            return
+
+        query_vector = await _run_in_executor(embed_query, query)
+        cached = _cache_lookup(query, query_vector, filters) if answer_cache is not None else None
+        if cached is not None:
+            for event in _complete_answer_events(cached.get("answer", ""), cached.get("sources", [])):
+                yield event
+            return
+
+        retrieved = await _run_in_executor(retrieve_context, query, k, query_vector, filters)
+        sources = retrieved["sources"]
+        yield _sources_event(sources)
+        pieces: List[str] = []
+        started = time.perf_counter()
+        try:
+            with metrics.profiled():
+                async for text in async_llm.stream(retrieved["prompt"]):
+                    if not pieces:
+                        metrics.record_first_token("httpx", time.perf_counter() - started)
+                    pieces.append(text)
+                    yield _sse_event("token", {"text": text})
+        except Exception:
+            metrics.record_llm("httpx", time.perf_counter() - started, ok=False)
+            raise
+        metrics.record_llm("httpx", time.perf_counter() - started)
+        if answer_cache is not None:
+            answer_cache.put(query_vector, {"answer": "".join(pieces), "sources": sources}, filters_key(filters), query)
+        yield _sse_event("done", {})
+    except LLMOverloadedError as e:
+        print("LLM overloaded, rejecting streaming query:", repr(e))
+        yield _sse_event("error", {"message": LLM_BUSY_MESSAGE})
+    except Exception as e:
+        print("Error streaming query:", repr(e))
+        yield _sse_event("error", {"message": QUERY_ERROR_MESSAGE})
+
+
+def warm_up() -> bool:
+    """
+    Load every component and exercise the embed + search path once, so the
+    first real request doesn't pay model-load and first-inference costs.
+    """
+    started = time.perf_counter()
+    try:
+        if not init_vectorstore_and_embeddings():
+            raise RuntimeError("vector store / embeddings failed to initialize")
+        _search_docs(["warm-up query"], [embed_query("warm-up query")], 1)
+        _init_llm()
+        _mark_component("warmup", started)
+        print(f"Warm-up finished in {time.perf_counter() - started:.2f}s.")
+        return True
+    except Exception as e:
+        _mark_component("warmup", started, e)
+        print("Warm-up failed:", repr(e))
+        return False
+
+
+# Background load started by startup or by /health/ready (warm_up or init_vectorstore_and_embeddings)
+_init_future: Optional[asyncio.Future] = None
+
+
+def _start_background_init():
+    """Start loading in the executor unless it is done or already running; failed loads are retried."""
+    global _init_future
+    if _init_future is not None and not _init_future.done():
+        return
+    if WARMUP_ON_STARTUP:
+        if not _component_status["warmup"]["ready"]:
+            _init_future = _run_in_executor(warm_up)
+    elif not _vectorstore_ready:
+        _init_future = _run_in_executor(init_vectorstore_and_embeddings)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        # Run in the background so the server can answer /health/ready while loading
+        _start_background_init()
+    yield
+    if async_llm is not None:
+        await async_llm.aclose()
 
 
 # --- FastAPI app & CORS ---
-app = FastAPI(title="NITai Project API")
+app = FastAPI(title="NITai Project API", lifespan=_lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -191,11 +885,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+if METRICS_ENABLED:
+    # Added after CORS so it wraps it: the timing covers the whole request
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    200 once the vector store and embeddings are loaded (and warm-up has finished with
+    WARMUP_ON_STARTUP=1). Without warm-up nothing loads until something asks, and a
+    probe-gated load balancer never sends that first query, so the probe itself
+    starts loading in the background. After a failed load or warm-up (DB missing
+    mid-deploy, model download timeout) the next probe starts another attempt.
+    """
+    _start_background_init()
+    components = {name: dict(status) for name, status in _component_status.items()}
+    ready = _vectorstore_ready and (not WARMUP_ON_STARTUP or components["warmup"]["ready"])
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "components": components})
+
+
+class QueryFilters(BaseModel):
+    """Metadata pre-filter: every field given must match; a list matches any of its values."""
+    doc_type: Optional[Union[str, List[str]]] = None  # "pdf" / "web"
+    department: Optional[Union[str, List[str]]] = None  # e.g. "cse", "ece"
+    category: Optional[Union[str, List[str]]] = None  # e.g. "syllabus", "notice"
+    source: Optional[Union[str, List[str]]] = None  # PDF file name or page URL
+    year: Optional[Union[int, List[int]]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+    def normalized(self) -> Optional[dict]:
+        return normalize_filters(self.model_dump(exclude_none=True))
 
 
 class QueryRequest(BaseModel):
     query: str
+    filters: Optional[QueryFilters] = None
 
 
 class QueryResponse(BaseModel):
@@ -203,17 +931,157 @@ class QueryResponse(BaseModel):
     source: Optional[str] = None
 
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
+    # True: NDJSON, one BatchQueryItem per line in completion order
+    stream: bool = False
+    # applied to every query in the batch
+    filters: Optional[QueryFilters] = None
+
+
+class BatchQueryItem(BaseModel):
+    index: int
+    query: str
+    answer: Optional[str] = None
+    source: Optional[str] = None
+    sources: List[str] = []
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
+
+
 @app.post("/api/query", response_model=QueryResponse)
 async def handle_query(request: QueryRequest):
     query = request.query
-    print("Received query:", query)
-    loop = asyncio.get_running_loop()
+    filters = request.filters.normalized() if request.filters else None
+    print("Received query:", query + (f" (filters: {filters})" if filters else ""))
     try:
-        result = await loop.run_in_executor(None, answer_with_retrieval, query, RETRIEVE_K)
+        if async_llm is not None:
+            result = await answer_with_retrieval_async(query, RETRIEVE_K, filters)
+        else:
+            result = await _run_in_executor(answer_with_retrieval, query, RETRIEVE_K, filters)
         answer = result.get("answer", "Sorry, I couldn't find an answer.")
         sources = result.get("sources", [])
         first_source = sources[0] if sources else "No source found"
         return QueryResponse(answer=answer, source=first_source)
+    except LLMOverloadedError as e:
+        # Shed load instead of queueing without bound
+        print("LLM overloaded, rejecting query:", repr(e))
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "1"},
+            content=jsonable_encoder(QueryResponse(answer=LLM_BUSY_MESSAGE, source="Error")),
+        )
     except Exception as e:
         print("Error processing query:", repr(e))
-        return QueryResponse(answer="An error occurred while processing the request.", source="Error")
+        return QueryResponse(answer=QUERY_ERROR_MESSAGE, source="Error")
+
+
+@app.post("/api/query/stream")
+async def handle_query_stream(request: QueryRequest):
+    query = request.query
+    filters = request.filters.normalized() if request.filters else None
+    print("Received streaming query:", query + (f" (filters: {filters})" if filters else ""))
+    # The sync generator is iterated in Starlette's threadpool, so retrieval and the
+    # blocking LLM stream never run on the event loop.
+    if async_llm is not None:
+        events = stream_answer_events_async(query, RETRIEVE_K, filters)
+    else:
+        events = stream_answer_events(query, RETRIEVE_K, filters)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _batch_item(index: int, query: str, result: dict) -> BatchQueryItem:
+    if "error" in result:
+        return BatchQueryItem(index=index, query=query, source="Error", error=result["error"])
+    sources = result.get("sources", [])
+    return BatchQueryItem(
+        index=index,
+        query=query,
+        answer=result.get("answer", "Sorry, I couldn't find an answer."),
+        source=sources[0] if sources else "No source found",
+        sources=sources,
+    )
+
+
+@app.post("/api/query/batch", response_model=BatchQueryResponse)
+async def handle_query_batch(request: BatchQueryRequest):
+    queries = request.queries
+    filters = request.filters.normalized() if request.filters else None
+    print(f"Received batch of {len(queries)} queries" + (f" (filters: {filters})" if filters else ""))
+    if request.stream:
+        async def lines():
+            async for index, result in answer_batch(queries, RETRIEVE_K, filters):
+                yield _batch_item(index, queries[index], result).model_dump_json() + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+    results: List[Optional[BatchQueryItem]] = [None] * len(queries)
+    async for index, result in answer_batch(queries, RETRIEVE_K, filters):
+        results[index] = _batch_item(index, queries[index], result)
+    return BatchQueryResponse(results=results)
+
+
+@app.get("/api/embedding/stats")
+async def embedding_stats():
+    stats = {"batching": False} if embedding_batcher is None else {"batching": True, **embedding_batcher.stats()}
+    if isinstance(embeddings, ServiceEmbeddings):
+        # remote stats show batching across all workers on the host
+        remote = await _run_in_executor(embeddings.client.remote_stats)
+        stats["service"] = {**embeddings.stats(), "remote": remote}
+    return stats
+
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    if async_llm is None:
+        return {"backend": LLM_BACKEND, "async_client": False}
+    return {"backend": LLM_BACKEND, "async_client": True, **async_llm.stats()}
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+
+def _component_metrics() -> List[str]:
+    """Answer cache, embedding batcher and async LLM client counters in exposition format."""
+    lines: List[str] = []
+    if answer_cache is not None:
+        stats = answer_cache.stats()
+        lines += gauge_lines("nitai_answer_cache_hits_total", "Answer cache hits.", stats["hits"], kind="counter")
+        lines += gauge_lines("nitai_answer_cache_misses_total", "Answer cache misses.", stats["misses"], kind="counter")
+        lines += gauge_lines("nitai_answer_cache_deduplicated_total", "Queries that joined an identical in-flight query.", stats["deduplicated_inflight"], kind="counter")
+        lines += gauge_lines("nitai_answer_cache_entries", "Answers currently cached.", stats["size"])
+    if embedding_batcher is not None:
+        stats = embedding_batcher.stats()
+        lines += bucket_lines("nitai_embedding_batch_size", "Queries per embedding batch.", stats["batch_size_histogram"], stats["items"])
+        lines += gauge_lines("nitai_embedding_seconds_total", "Time spent in batched embedding calls.", stats["embed_seconds_total"], kind="counter")
+        lines += gauge_lines("nitai_embedding_pending", "Queries waiting for the next embedding batch.", stats["pending"])
+    if isinstance(embeddings, ServiceEmbeddings):
+        lines += gauge_lines("nitai_embedding_service_fallbacks_total", "Embedding calls served in-process because the sidecar was down.",
+                             embeddings.fallbacks, kind="counter")
+    if async_llm is not None:
+        stats = async_llm.stats()
+        lines += gauge_lines("nitai_llm_in_flight", "LLM requests currently running.", stats["in_flight"])
+        lines += gauge_lines("nitai_llm_waiting", "LLM requests waiting for a slot.", stats["waiting"])
+        lines += gauge_lines("nitai_llm_rejected_total", "LLM requests shed with 503.", stats["rejected"], kind="counter")
+        lines += gauge_lines("nitai_llm_retries_total", "LLM request retries.", stats["retries"], kind="counter")
+    return lines
+
+
+metrics.registry.register_collector(_component_metrics)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,195 @@
+# metadata_filters.py
+# Metadata pre-filters for retrieval ("only syllabus PDFs", "only this year's notices").
+# build_vectordb.py records the fields below on every chunk; a query's filters are
+# applied before the vector search, as a Chroma `where` clause or as a row mask over
+# the numpy/lexical indexes, so only the matching subset is scored.
+#
+# Normalized filters (what normalize_filters returns) look like
+#   {"doc_type": ["pdf"], "category": ["syllabus"], "year": [2024], "date_from": 20240101}
+# Every field given must match; a list matches any of its values.
+import os
+import json
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Exact-match string fields (lower-case slugs, except source)
+CATEGORICAL_FIELDS = ("doc_type", "department", "category", "source")
+# Exact-match integer fields
+INTEGER_FIELDS = ("year",)
+# "date" is stored as an int YYYYMMDD so Chroma can range-filter it
+DATE_FIELD = "date"
+
+_CASE_INSENSITIVE = ("doc_type", "department", "category")
+
+FILTERS_FILE = "filters.json"
+
+
+def date_to_int(value) -> Optional[int]:
+    """date / "YYYY-MM-DD" / YYYYMMDD -> int YYYYMMDD (None if not a date)."""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value.year * 10000 + value.month * 100 + value.day
+    if isinstance(value, int):
+        return value if 10000101 <= value <= 99991231 else None
+    try:
+        return date_to_int(date.fromisoformat(str(value)[:10]))
+    except ValueError:
+        return None
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def normalize_filters(raw: Optional[dict]) -> Optional[dict]:
+    """Validate and normalize filters from the API; None when nothing is filtered."""
+    if not raw:
+        return None
+    filters = {}
+    for field in CATEGORICAL_FIELDS:
+        values = [str(v).strip() for v in _as_list(raw.get(field)) if str(v).strip()]
+        if field in _CASE_INSENSITIVE:
+            values = [v.lower() for v in values]
+        if values:
+            filters[field] = sorted(set(values))
+    for field in INTEGER_FIELDS:
+        values = sorted({int(v) for v in _as_list(raw.get(field))})
+        if values:
+            filters[field] = values
+    for bound in ("date_from", "date_to"):
+        if raw.get(bound) is not None:
+            value = date_to_int(raw[bound])
+            if value is None:
+                raise ValueError(f"{bound} must be a date (YYYY-MM-DD), got {raw[bound]!r}")
+            filters[bound] = value
+    return filters or None
+
+
+def filters_key(filters: Optional[dict]) -> str:
+    """Stable string for a normalized filter set; "" when unfiltered (answer cache scope)."""
+    return json.dumps(filters, sort_keys=True, separators=(",", ":")) if filters else ""
+
+
+def chroma_where(filters: Optional[dict]) -> Optional[dict]:
+    """The equivalent Chroma `where` clause."""
+    if not filters:
+        return None
+    clauses = []
+    for field in CATEGORICAL_FIELDS + INTEGER_FIELDS:
+        values = filters.get(field)
+        if values:
+            clauses.append({field: values[0]} if len(values) == 1 else {field: {"$in": values}})
+    if "date_from" in filters:
+        clauses.append({DATE_FIELD: {"$gte": filters["date_from"]}})
+    if "date_to" in filters:
+        clauses.append({DATE_FIELD: {"$lte": filters["date_to"]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def matches(metadata: dict, filters: Optional[dict]) -> bool:
+    """Whether one chunk's metadata passes the filters (same semantics as chroma_where)."""
+    if not filters:
+        return True
+    for field in CATEGORICAL_FIELDS + INTEGER_FIELDS:
+        if field in filters and metadata.get(field) not in filters[field]:
+            return False
+    value = metadata.get(DATE_FIELD)
+    if "date_from" in filters and not (isinstance(value, int) and value >= filters["date_from"]):
+        return False
+    if "date_to" in filters and not (isinstance(value, int) and value <= filters["date_to"]):
+        return False
+    return True
+
+
+class FilterColumns:
+    """
+    Columnar copy of the filterable metadata of an index, one entry per row, so a
+    filter becomes a few vectorized comparisons instead of parsing chunk metadata.
+    Strings are stored as int32 codes into a per-field vocabulary (-1 = missing);
+    integers as int32 (0 = missing).
+
+    Files: filters.json (vocabularies) and filter_<field>.npy, memory-mapped on load.
+    """
+
+    def __init__(self, vocab: Optional[Dict[str, List[str]]] = None, columns: Optional[Dict[str, np.ndarray]] = None):
+        self.vocab = vocab or {field: [] for field in CATEGORICAL_FIELDS}
+        self.columns = columns
+        self._codes = {field: {v: i for i, v in enumerate(values)} for field, values in self.vocab.items()}
+        self._rows: Dict[str, list] = {field: [] for field in CATEGORICAL_FIELDS + INTEGER_FIELDS + (DATE_FIELD,)}
+
+    # --- building ---
+    def add(self, metadata: dict):
+        metadata = metadata or {}
+        for field in CATEGORICAL_FIELDS:
+            value = metadata.get(field)
+            if value is None or value == "":
+                self._rows[field].append(-1)
+                continue
+            codes = self._codes[field]
+            if value not in codes:
+                codes[value] = len(self.vocab[field])
+                self.vocab[field].append(value)
+            self._rows[field].append(codes[value])
+        for field in INTEGER_FIELDS + (DATE_FIELD,):
+            value = metadata.get(field)
+            self._rows[field].append(value if isinstance(value, int) else 0)
+
+    def save(self, path: str):
+        for field, values in self._rows.items():
+            np.save(os.path.join(path, f"filter_{field}.npy"), np.asarray(values, dtype=np.int32))
+        with open(os.path.join(path, FILTERS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"fields": list(self._rows), "vocab": self.vocab}, f, ensure_ascii=False)
+
+    @classmethod
+    def from_metadatas(cls, metadatas: Iterable[dict]) -> "FilterColumns":
+        built = cls()
+        for metadata in metadatas:
+            built.add(metadata)
+        built.columns = {field: np.asarray(values, dtype=np.int32) for field, values in built._rows.items()}
+        return built
+
+    @classmethod
+    def load(cls, path: str) -> Optional["FilterColumns"]:
+        """None for an index written before filter columns existed."""
+        info_path = os.path.join(path, FILTERS_FILE)
+        if not os.path.exists(info_path):
+            return None
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        columns = {field: np.load(os.path.join(path, f"filter_{field}.npy"), mmap_mode="r") for field in info["fields"]}
+        return cls(info["vocab"], columns)
+
+    # --- querying ---
+    def mask(self, filters: dict) -> np.ndarray:
+        """Boolean mask of the rows that pass `filters`."""
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else (mask & condition)
+
+        for field in CATEGORICAL_FIELDS:
+            if field in filters:
+                codes = [self._codes[field][v] for v in filters[field] if v in self._codes[field]]
+                narrow(np.isin(self.columns[field], codes))
+        for field in INTEGER_FIELDS:
+            if field in filters:
+                narrow(np.isin(self.columns[field], filters[field]))
+        if "date_from" in filters:
+            narrow(self.columns[DATE_FIELD] >= filters["date_from"])
+        if "date_to" in filters:
+            column = self.columns[DATE_FIELD]
+            narrow((column > 0) & (column <= filters["date_to"]))
+        if mask is None:
+            return np.ones(len(self.columns[DATE_FIELD]), dtype=bool)
+        return mask
+
+    def rows(self, filters: dict) -> np.ndarray:
+        return np.flatnonzero(self.mask(filters))
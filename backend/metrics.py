@@ -0,0 +1,431 @@
+# metrics.py
+# Per-stage latency instrumentation for the query path.
+#   - Prometheus text exposition for /metrics (histograms, counters, collector callbacks)
+#   - per-request stage timings, rendered as a Server-Timing header
+#   - optional sampling profiler that dumps folded stacks for slow requests
+# When disabled, timed() returns a shared no-op context manager, so the hot path
+# pays one attribute lookup and a function call per stage.
+import os
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP = nullcontext()
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labelvalues: str):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value!r}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """`collector` returns ready-made exposition lines (for stats owned by other modules)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                lines.append(f"# collector error: {e!r}")
+        return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, help: str, value: float, labels: Optional[Dict[str, str]] = None, kind: str = "gauge") -> List[str]:
+    labels = labels or {}
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}",
+            f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {float(value)!r}"]
+
+
+def bucket_lines(name: str, help: str, buckets: Dict[str, int], total: float) -> List[str]:
+    """Histogram exposition from non-cumulative {upper bound label: count} buckets (last one "+Inf")."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    cumulative = 0
+    for le, count in buckets.items():
+        cumulative += count
+        lines.append(f'{name}_bucket{{le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum {float(total)!r}")
+    lines.append(f"{name}_count {cumulative}")
+    return lines
+
+
+# --- per-request timings ---
+class RequestTimings:
+    __slots__ = ("stages", "attrs", "threads", "tasks", "samples", "started")
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float, Optional[str]]] = []  # (stage, seconds, description)
+        self.attrs: Dict[str, str] = {}
+        # What the profiler samples: threads / event-loop tasks currently inside one of
+        # this request's stages, with a nesting count. Executor threads are shared by
+        # requests, so they are only attributed to a request while a stage is open.
+        self.threads: Dict[int, int] = {}
+        self.tasks: Dict[asyncio.Task, list] = {}  # task -> [count, loop, loop thread ident]
+        self.samples: Dict[str, int] = {}  # folded stack -> sample count
+        self.started = time.perf_counter()
+
+    def server_timing(self, total_s: Optional[float] = None) -> str:
+        parts = []
+        for stage, seconds, desc in self.stages:
+            part = f"{stage};dur={seconds * 1000.0:.1f}"
+            if desc:
+                part += f';desc="{desc}"'
+            parts.append(part)
+        if total_s is not None:
+            parts.append(f"total;dur={total_s * 1000.0:.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("nitai_request_timings", default=None)
+
+
+class Metrics:
+    """Process-wide instrumentation; one instance lives in main.py."""
+
+    def __init__(self, enabled: bool = True, profile_slow_ms: float = 0.0,
+                 profile_interval_ms: float = 5.0, profile_dir: str = "profiles"):
+        self.enabled = enabled
+        self.registry = Registry()
+        self.stage_seconds = self.registry.register(Histogram(
+            "nitai_stage_seconds", "Time spent in each query pipeline stage.", ("stage",)))
+        self.llm_seconds = self.registry.register(Histogram(
+            "nitai_llm_seconds", "LLM call duration by path.", ("path",)))
+        self.llm_first_token_seconds = self.registry.register(Histogram(
+            "nitai_llm_first_token_seconds", "Time to first streamed token by LLM path.", ("path",)))
+        self.llm_calls = self.registry.register(Counter(
+            "nitai_llm_calls_total", "LLM calls by path and outcome.", ("path", "outcome")))
+        self.request_seconds = self.registry.register(Histogram(
+            "nitai_request_seconds", "HTTP request duration.", ("method", "route", "status")))
+        self.profiler = SlowRequestProfiler(profile_slow_ms, profile_interval_ms, profile_dir) if enabled and profile_slow_ms > 0 else None
+
+    # --- request scope ---
+    def begin_request(self) -> Optional[RequestTimings]:
+        if not self.enabled:
+            return None
+        timings = RequestTimings()
+        _current.set(timings)
+        if self.profiler is not None:
+            self.profiler.track(timings)
+        return timings
+
+    def end_request(self, timings: Optional[RequestTimings], method: str, route: str, status: int, label: str = ""):
+        if timings is None:
+            return
+        total = time.perf_counter() - timings.started
+        self.request_seconds.observe(total, method, route, str(status))
+        if self.profiler is not None:
+            self.profiler.finish(timings, total, label or f"{method} {route}")
+
+    @staticmethod
+    def current() -> Optional[RequestTimings]:
+        return _current.get()
+
+    def set_attr(self, key: str, value: str):
+        timings = _current.get()
+        if timings is not None:
+            timings.attrs[key] = value
+
+    # --- stage timing ---
+    def timed(self, stage: str, desc: Optional[str] = None):
+        if not self.enabled:
+            return _NOOP
+        return self._timed(stage, desc)
+
+    @contextmanager
+    def _timed(self, stage: str, desc: Optional[str]):
+        timings = _current.get()
+        with self._sampled(timings):
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                elapsed = time.perf_counter() - started
+                self.stage_seconds.observe(elapsed, stage)
+                if timings is not None:
+                    timings.stages.append((stage, elapsed, desc))
+
+    def profiled(self):
+        """
+        Let the slow-request profiler sample this block without recording a stage,
+        e.g. an LLM call. On the event loop this covers awaits as well.
+        """
+        if self.profiler is None:
+            return _NOOP
+        return self._sampled(_current.get())
+
+    @contextmanager
+    def _sampled(self, timings: Optional[RequestTimings]):
+        if timings is None or self.profiler is None:
+            yield
+            return
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # not on an event loop thread
+            task = None
+        if task is not None:
+            entry = timings.tasks.setdefault(task, [0, task.get_loop(), threading.get_ident()])
+            entry[0] += 1
+        else:
+            ident = threading.get_ident()
+            timings.threads[ident] = timings.threads.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            if task is not None:
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    timings.tasks.pop(task, None)
+            else:
+                remaining = timings.threads.get(ident, 1) - 1
+                if remaining > 0:
+                    timings.threads[ident] = remaining
+                else:
+                    timings.threads.pop(ident, None)
+
+    def record_llm(self, path: str, seconds: float, ok: bool = True):
+        if not self.enabled:
+            return
+        self.llm_calls.inc(path, "ok" if ok else "error")
+        if ok:
+            self.llm_seconds.observe(seconds, path)
+            self.set_attr("llm_path", path)
+            timings = _current.get()
+            if timings is not None:
+                timings.stages.append(("llm", seconds, path))
+
+    def record_first_token(self, path: str, seconds: float):
+        if self.enabled:
+            self.llm_first_token_seconds.observe(seconds, path)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: opens a RequestTimings scope per HTTP request, adds a
+    Server-Timing header with the stages finished before the response starts, and
+    records the request duration once the last body chunk is sent (so streamed
+    responses are timed end to end). Only installed when metrics are enabled.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = self.metrics.begin_request()
+        status = 500
+        finished = False
+
+        def route() -> str:
+            # the router stores the matched route in the scope; fall back to a fixed
+            # label so unknown paths don't create unbounded series
+            return getattr(scope.get("route"), "path", None) or "unmatched"
+
+        async def send_wrapper(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.server_timing(time.perf_counter() - timings.started)
+                if header:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False) and not finished:
+                finished = True
+                self.metrics.end_request(timings, scope["method"], route(), status)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not finished:  # errors and client disconnects
+                finished = True
+                self.metrics.end_request(timings, scope["method"], route(), status)
+
+
+class SlowRequestProfiler:
+    """
+    Samples the stacks of threads doing work for in-flight requests every
+    `interval_ms`. Requests slower than `threshold_ms` get their samples written
+    to `profile_dir` in folded-stack format (flamegraph.pl / speedscope input).
+    The sampler thread only runs while there are tracked requests.
+
+    A request on the event loop is sampled from the loop thread while its task is
+    the one running, and as its chain of awaiting coroutines (rooted at "(await)")
+    while it is suspended, e.g. waiting on the async LLM client.
+    """
+
+    MAX_DEPTH = 64
+
+    def __init__(self, threshold_ms: float, interval_ms: float = 5.0, profile_dir: str = "profiles"):
+        self.threshold_s = threshold_ms / 1000.0
+        self.interval_s = max(interval_ms, 1.0) / 1000.0
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._active: List[RequestTimings] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, timings: RequestTimings):
+        with self._lock:
+            self._active.append(timings)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+
+    def finish(self, timings: RequestTimings, total_s: float, label: str):
+        with self._lock:
+            if timings in self._active:
+                self._active.remove(timings)
+        if total_s >= self.threshold_s and timings.samples:
+            self._dump(timings, total_s, label)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_s)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+            frames = sys._current_frames()
+            for timings in active:
+                for ident in list(timings.threads):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self._add_sample(timings, self._thread_stack(frame))
+                for task, (_, loop, ident) in list(timings.tasks.items()):
+                    if asyncio.current_task(loop) is task:
+                        frame = frames.get(ident)
+                        if frame is not None:
+                            self._add_sample(timings, self._thread_stack(frame))
+                    else:
+                        self._add_sample(timings, ["(await)"] + self._await_stack(task.get_coro()))
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+    def _thread_stack(self, frame) -> List[str]:
+        stack = []
+        while frame is not None and len(stack) < self.MAX_DEPTH:
+            stack.append(self._frame_name(frame))
+            frame = frame.f_back
+        return stack[::-1]
+
+    def _await_stack(self, coro) -> List[str]:
+        """Outermost first: follow what each suspended coroutine is awaiting."""
+        stack = []
+        while coro is not None and len(stack) < self.MAX_DEPTH:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append(self._frame_name(frame))
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+        return stack
+
+    @staticmethod
+    def _add_sample(timings: RequestTimings, stack: List[str]):
+        if stack:
+            folded = ";".join(stack)
+            timings.samples[folded] = timings.samples.get(folded, 0) + 1
+
+    def _dump(self, timings: RequestTimings, total_s: float, label: str):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            safe = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+            path = os.path.join(self.profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(total_s * 1000)}ms-{safe}.folded")
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in sorted(timings.samples.items(), key=lambda kv: -kv[1]):
+                    f.write(f"{stack} {count}\n")
+            print(f"Slow request ({total_s * 1000:.0f} ms, {label}): profile written to {path}")
+        except OSError as e:
+            print("Could not write slow-request profile:", repr(e))
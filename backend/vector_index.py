@@ -0,0 +1,315 @@
+# vector_index.py
+# In-process, memory-mapped vector index (RETRIEVAL_BACKEND=numpy).
+#
+# Layout of an index directory:
+#   index.json         count, dim, dtype, embedding model
+#   vectors.npy        (count, dim) L2-normalized vectors; float32, float16 or int8
+#   scales.npy         (count,) float32 per-row scale, int8 indexes only
+#   chunks.jsonl       one {"id", "text", "metadata"} object per line
+#   chunk_offsets.npy  (count + 1,) uint64 byte offsets of each line in chunks.jsonl
+#   filters.json + filter_<field>.npy   filterable metadata columns (metadata_filters.FilterColumns)
+#
+# Everything is opened with mmap, so several uvicorn workers on one host share the
+# same physical pages through the OS page cache instead of each loading a copy.
+import os
+import json
+import mmap
+import time
+import shutil
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from metadata_filters import FilterColumns
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+# Rows scored per step when the stored dtype must be widened to float32
+SCORE_BLOCK_ROWS = 16384
+
+
+class IndexedChunk:
+    """Retrieval result with the same attributes answer_with_retrieval reads from LangChain Documents."""
+
+    __slots__ = ("id", "page_content", "metadata", "score")
+
+    def __init__(self, id: str, page_content: str, metadata: dict, score: float):
+        self.id = id
+        self.page_content = page_content
+        self.metadata = metadata
+        self.score = score
+
+    def __repr__(self):
+        return f"IndexedChunk(id={self.id!r}, score={self.score:.4f}, metadata={self.metadata!r})"
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def swap_directory(tmp_path: str, path: str):
+    """
+    Move a freshly written index directory into place. Processes that still have the
+    old files mapped keep reading them until they reload; unlinked files stay valid on POSIX.
+    """
+    old_path = path + ".old"
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+class ChunkStore:
+    """Random access to chunks.jsonl through chunk_offsets.npy, both memory-mapped."""
+
+    def __init__(self, path: str):
+        self.offsets = np.load(os.path.join(path, "chunk_offsets.npy"), mmap_mode="r")
+        self._file = open(os.path.join(path, "chunks.jsonl"), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get(self, row: int) -> dict:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self._mmap[start:end])
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+
+class ChunkStoreWriter:
+    def __init__(self, path: str):
+        self._file = open(os.path.join(path, "chunks.jsonl"), "wb")
+        self._offsets_path = os.path.join(path, "chunk_offsets.npy")
+        self._offsets = [0]
+
+    def add(self, chunk_id: str, text: str, metadata: dict):
+        line = json.dumps({"id": chunk_id, "text": text, "metadata": metadata or {}}, ensure_ascii=False)
+        data = line.encode("utf-8") + b"\n"
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def close(self):
+        self._file.close()
+        np.save(self._offsets_path, np.asarray(self._offsets, dtype=np.uint64))
+
+
+class VectorIndexWriter:
+    """
+    Streams vectors and chunks into a new index directory. The index is written to
+    `<path>.tmp` and swapped into place by close(), so running servers never see a
+    half-written index.
+    """
+
+    def __init__(self, path: str, count: int, dim: int, dtype: str = "float32", model: Optional[str] = None):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype!r}")
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.count = count
+        self.dim = dim
+        self.dtype = dtype
+        self.model = model
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+        os.makedirs(self.tmp_path)
+
+        self._vectors = np.lib.format.open_memmap(
+            os.path.join(self.tmp_path, "vectors.npy"), mode="w+", dtype=np.dtype(dtype), shape=(count, dim)
+        )
+        self._scales = np.ones(count, dtype=np.float32) if dtype == "int8" else None
+        self._chunks = ChunkStoreWriter(self.tmp_path)
+        self._filters = FilterColumns()
+        self._row = 0
+
+    def add(self, ids: Sequence[str], vectors, documents: Sequence[str], metadatas: Sequence[dict]):
+        block = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        n = len(block)
+        if self._row + n > self.count:
+            raise ValueError(f"more rows than the declared count ({self.count})")
+        rows = slice(self._row, self._row + n)
+        if self.dtype == "int8":
+            scales = np.abs(block).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._vectors[rows] = np.round(block / scales[:, None]).astype(np.int8)
+            self._scales[rows] = scales
+        else:
+            self._vectors[rows] = block.astype(self.dtype)
+        for chunk_id, text, meta in zip(ids, documents, metadatas):
+            self._chunks.add(chunk_id, text, meta)
+            self._filters.add(meta)
+        self._row += n
+
+    def close(self):
+        if self._row != self.count:
+            raise ValueError(f"expected {self.count} rows, got {self._row}")
+        self._vectors.flush()
+        del self._vectors
+        self._chunks.close()
+        self._filters.save(self.tmp_path)
+        if self._scales is not None:
+            np.save(os.path.join(self.tmp_path, "scales.npy"), self._scales)
+        with open(os.path.join(self.tmp_path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "dim": self.dim, "dtype": self.dtype, "model": self.model}, f)
+
+        swap_directory(self.tmp_path, self.path)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class ReloadingIndex:
+    """
+    Base for on-disk indexes that reload themselves when rebuilt. Subclasses implement
+    _load(), which must publish everything it read in one attribute assignment;
+    `stamp_file` is checked at most every `reload_check_s` seconds.
+    """
+
+    stamp_file = "index.json"
+
+    def __init__(self, path: str, reload_check_s: float = 2.0):
+        self.path = path
+        self.reload_check_s = reload_check_s
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._stamp = self._index_stamp()
+        self._load()
+
+    def _index_stamp(self):
+        st = os.stat(os.path.join(self.path, self.stamp_file))
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _filter_columns(self, state: dict) -> FilterColumns:
+        """Filter columns from disk, or built from chunk metadata once for indexes that predate them."""
+        if state.get("filters") is None:
+            chunks = state["chunks"]
+            print(f"Index '{self.path}' has no filter columns; building them from chunk metadata (rebuild the index to skip this).")
+            state["filters"] = FilterColumns.from_metadatas(chunks.get(row).get("metadata") or {} for row in range(len(chunks)))
+        return state["filters"]
+
+    def filter_rows(self, filters: Optional[dict], state: Optional[dict] = None) -> Optional[np.ndarray]:
+        """Rows passing normalized `filters` (metadata_filters.normalize_filters); None = all rows."""
+        if not filters:
+            return None
+        return self._filter_columns(state or self._state).rows(filters)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.reload_check_s:
+            return
+        with self._lock:
+            if now - self._last_check < self.reload_check_s:
+                return
+            self._last_check = now
+            try:
+                stamp = self._index_stamp()
+                if stamp != self._stamp:
+                    self._load()
+                    self._stamp = stamp
+            except (OSError, ValueError) as e:
+                print(f"Reloading index '{self.path}' failed, keeping the loaded one:", repr(e))
+
+
+class NumpyVectorIndex(ReloadingIndex):
+    """
+    Exact top-k cosine search over a memory-mapped matrix. Exposes
+    similarity_search_by_vector() like the LangChain Chroma wrapper, so
+    retrieve_context works with either backend.
+    """
+
+    def _load(self):
+        with open(os.path.join(self.path, "index.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        scales = None
+        if info["dtype"] == "int8":
+            scales = np.load(os.path.join(self.path, "scales.npy"), mmap_mode="r")
+        chunks = ChunkStore(self.path)
+
+        # One assignment, so a concurrent search sees either the old or the new index.
+        # The old maps are not closed here; in-flight searches may still read them.
+        self._state = {"info": info, "vectors": vectors, "scales": scales, "chunks": chunks,
+                       "filters": FilterColumns.load(self.path)}
+        print(f"Loaded numpy vector index from '{self.path}' ({info['count']} x {info['dim']}, {info['dtype']}).")
+
+    @property
+    def info(self) -> dict:
+        return self._state["info"]
+
+    def __len__(self):
+        return int(self.info["count"])
+
+    def scores(self, query_vector, rows: Optional[np.ndarray] = None, state=None) -> np.ndarray:
+        """
+        Cosine similarity of the query against every row (or only `rows`).
+        A (m, dim) matrix of queries gives (m, rows) scores from one pass over the index.
+        """
+        q = np.asarray(query_vector, dtype=np.float32)
+        single = q.ndim == 1
+        q = _normalize_rows(np.atleast_2d(q)).T
+        state = state or self._state
+        vectors, scales = state["vectors"], state["scales"]
+        if rows is not None:
+            vectors = vectors[rows]
+            scales = scales[rows] if scales is not None else None
+        if vectors.dtype == np.float32:
+            out = vectors @ q
+        else:
+            out = np.empty((len(vectors), q.shape[1]), dtype=np.float32)
+            for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+                block = np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+                out[start:start + len(block)] = block @ q
+            if scales is not None:
+                out *= scales[:, None]
+        return out[:, 0] if single else out.T
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4,
+                                    filter: Optional[dict] = None, **kwargs) -> List[IndexedChunk]:
+        """`filter` takes normalized metadata filters; only matching rows are scored."""
+        return self.similarity_search_by_vectors([embedding], k, filter=filter)[0]
+
+    def similarity_search_by_vectors(self, embeddings: Sequence[Sequence[float]], k: int = 4,
+                                     filter: Optional[dict] = None) -> List[List[IndexedChunk]]:
+        """similarity_search_by_vector for several queries with a single matrix product."""
+        self._maybe_reload()
+        state = self._state
+        if len(embeddings) == 0:
+            return []
+        rows = self.filter_rows(filter, state)
+        if rows is not None and len(rows) == 0:
+            return [[] for _ in embeddings]
+        scores = self.scores(embeddings, rows=rows, state=state)
+        results = []
+        for row_scores in np.atleast_2d(scores):
+            hits = top_k(row_scores, k)
+            # with a filter, positions index into `rows`, not the whole matrix
+            index_rows = rows[hits] if rows is not None else hits
+            results.append([self.get_chunk(int(row), float(row_scores[pos]), state) for row, pos in zip(index_rows, hits)])
+        return results
+
+    def get_chunk(self, row: int, score: float = 0.0, state=None) -> IndexedChunk:
+        record = (state or self._state)["chunks"].get(row)
+        return IndexedChunk(record["id"], record["text"], record.get("metadata") or {}, score)
+
+    def stats(self) -> Dict[str, object]:
+        state = self._state
+        return {"path": self.path, **state["info"], "bytes": int(state["vectors"].nbytes),
+                "filter_columns": state["filters"] is not None}
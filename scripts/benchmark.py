@@ -0,0 +1,523 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import signal
+import asyncio
+import platform
+import tempfile
+import argparse
+import threading
+import subprocess
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Offline benchmark for the ingestion scripts and the query API.
+#
+#   python scripts/benchmark.py --output benchmark_results.json
+#
+# Everything runs against local fixtures: the bundled syllabus PDF(s), a generated
+# HTML site served from 127.0.0.1, and the backend with LLM_BACKEND=fake. The
+# embedding model must already be in the Hugging Face cache; the Hub is forced
+# offline so a missing model fails fast instead of downloading.
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "scripts")
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend")
+PDF_FIXTURE_DIR = os.path.join(REPO_ROOT, "data", "pdfs")
+
+STAGES = ("ingest_pdf", "ingest_web", "build_vectordb", "retrieval", "query")
+
+# --- Defaults ---
+PDF_COPIES = 4               # copies of each bundled PDF, so extraction workers have work to share
+WEB_PAGES = 200              # pages in the generated fixture site
+CONCURRENCY_LEVELS = "1,4,16,32"
+REQUESTS_PER_LEVEL = 200
+RETRIEVAL_ITERATIONS = 200
+FAKE_LLM_LATENCY_MS = 200.0
+SERVER_START_TIMEOUT = 180.0
+STAGE_TIMEOUT = 3600.0
+SEED = 1234
+
+QUERIES = [
+    "What is the syllabus for Mathematics-I?",
+    "Which topics are covered in MA101?",
+    "What are the credits for the first year physics course?",
+    "List the experiments in the chemistry laboratory.",
+    "What is taught in Basic Electrical Engineering?",
+    "Which textbooks are recommended for programming for problem solving?",
+    "How many credits does the first year carry in total?",
+    "What is the course outcome of engineering graphics?",
+    "When is the mid semester examination held?",
+    "Who is the head of the computer science department?",
+    "What are the library opening hours?",
+    "How do I apply for hostel accommodation?",
+    "What is the fee structure for B.Tech?",
+    "Which clubs are active on campus?",
+    "What is the vision of NIT Agartala?",
+    "What research areas does the electronics department work on?",
+]
+
+# Vocabulary for the generated site; pages deliberately share phrasing so the
+# near-duplicate and overlap handling in the backend gets exercised.
+DEPARTMENTS = ["Computer Science and Engineering", "Electronics and Communication Engineering",
+               "Electrical Engineering", "Mechanical Engineering", "Civil Engineering",
+               "Chemical Engineering", "Production Engineering", "Biotechnology",
+               "Mathematics", "Physics", "Chemistry", "Humanities and Social Sciences"]
+TOPICS = ["admission", "examination", "hostel", "scholarship", "library", "laboratory", "placement",
+          "research", "seminar", "workshop", "curriculum", "internship", "fee payment", "convocation"]
+SENTENCES = [
+    "The {dept} department announces the {topic} schedule for the {year} academic session.",
+    "Students of {dept} must complete the {topic} formalities before {day} {month} {year}.",
+    "Course {code} offered by {dept} carries {credits} credits and includes a {topic} component.",
+    "The {topic} committee of {dept} meets every {weekday} in room {room}.",
+    "Queries about {topic} should be sent to the {dept} office, room {room}.",
+    "The {year} {topic} notice for {dept} has been published on the institute website.",
+]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August",
+          "September", "October", "November", "December"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+# --- Fixtures ---
+def generate_site(site_dir, n_pages, seed=SEED):
+    """Write `n_pages` deterministic HTML pages plus an index linking to all of them."""
+    rng = random.Random(seed)
+    os.makedirs(site_dir, exist_ok=True)
+    links = []
+    for i in range(n_pages):
+        dept = DEPARTMENTS[i % len(DEPARTMENTS)]
+        paragraphs = []
+        for _ in range(rng.randint(6, 14)):
+            words = []
+            for _ in range(rng.randint(3, 7)):
+                words.append(rng.choice(SENTENCES).format(
+                    dept=dept, topic=rng.choice(TOPICS), year=rng.randint(2019, 2025),
+                    day=rng.randint(1, 28), month=rng.choice(MONTHS), weekday=rng.choice(WEEKDAYS),
+                    code=f"{dept[:2].upper()}{rng.randint(101, 499)}", credits=rng.randint(1, 4),
+                    room=f"{rng.choice('ABCD')}-{rng.randint(100, 399)}",
+                ))
+            paragraphs.append(f"<p>{' '.join(words)}</p>")
+        name = f"page-{i:04d}.html"
+        links.append(name)
+        neighbours = "".join(f'<a href="page-{j % n_pages:04d}.html">next</a>' for j in (i + 1, i + 7))
+        with open(os.path.join(site_dir, name), "w", encoding="utf-8") as f:
+            f.write(f"<html><head><title>{dept} {i}</title></head><body>"
+                    f"<nav><a href=\"index.html\">Home</a>{neighbours}</nav>"
+                    f"<div id=\"main-content\"><h1>{dept} notice {i}</h1>{''.join(paragraphs)}</div>"
+                    f"</body></html>")
+    with open(os.path.join(site_dir, "index.html"), "w", encoding="utf-8") as f:
+        items = "".join(f'<li><a href="{name}">{name}</a></li>' for name in links)
+        f.write(f"<html><body><div id=\"main-content\"><h1>Notices</h1><ul>{items}</ul></div></body></html>")
+    return n_pages + 1
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    """Serve `directory` on an ephemeral 127.0.0.1 port. Returns (server, base URL)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Measurement helpers ---
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies_s):
+    values = sorted(latencies_s)
+    if not values:
+        return {"count": 0}
+    ms = lambda v: round(v * 1000.0, 3)
+    return {
+        "count": len(values),
+        "mean_ms": ms(sum(values) / len(values)),
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]),
+    }
+
+
+def offline_env(**overrides):
+    env = dict(os.environ)
+    env.update({"HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1", "PYTHONUNBUFFERED": "1"})
+    env.update({k: str(v) for k, v in overrides.items()})
+    return env
+
+
+def run_process(name, cmd, cwd, env, log_dir, timeout):
+    """
+    Run `cmd` to completion with output in `<log_dir>/<name>.log`. Peak RSS comes from
+    wait4(), i.e. the largest resident set of the process or any child it reaped
+    (build_vectordb.py's embedding workers included). After `timeout` seconds the
+    whole process group is killed.
+    """
+    log_path = os.path.join(log_dir, f"{name}.log")
+    started = time.perf_counter()
+    timed_out = False
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() - started > timeout and not timed_out:
+                timed_out = True
+                os.killpg(proc.pid, signal.SIGKILL)
+            time.sleep(0.05)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    result = {
+        "seconds": round(time.perf_counter() - started, 3),
+        "exit_code": proc.returncode,
+        "timed_out": timed_out,
+        "peak_rss_mb": round(usage.ru_maxrss / 1024.0, 1),  # ru_maxrss is in KiB on Linux
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "log": log_path,
+    }
+    if proc.returncode != 0:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            result["error"] = f.read()[-2000:]
+        print(f"  {name} failed (exit {proc.returncode}); see {log_path}")
+    return result
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+# --- Ingestion stages ---
+def bench_ingest_pdf(ws, args):
+    pdf_dir = os.path.join(ws, "data", "pdfs")
+    out_dir = os.path.join(ws, "data", "pdf_text")
+    os.makedirs(pdf_dir, exist_ok=True)
+    sources = sorted(f for f in os.listdir(PDF_FIXTURE_DIR) if f.lower().endswith(".pdf"))
+    total_bytes = 0
+    for name in sources:
+        for copy in range(args.pdf_copies):
+            target = os.path.join(pdf_dir, f"{os.path.splitext(name)[0]}_{copy}.pdf")
+            shutil.copyfile(os.path.join(PDF_FIXTURE_DIR, name), target)
+            total_bytes += os.path.getsize(target)
+
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, "ingest_pdf.py"), "--pdf-dir", pdf_dir,
+           "--output-dir", out_dir, "--workers", str(args.workers)]
+    cold = run_process("ingest_pdf", cmd, ws, offline_env(), args.log_dir, args.stage_timeout)
+    pages = 0
+    for name in os.listdir(out_dir) if os.path.isdir(out_dir) else []:
+        if name.endswith(".pages.json"):
+            with open(os.path.join(out_dir, name), "r", encoding="utf-8") as f:
+                pages += len(json.load(f).get("page_offsets", []))
+    cold.update({"files": len(sources) * args.pdf_copies, "pages": pages, "megabytes": round(total_bytes / 1e6, 2),
+                 "pages_per_sec": rate(pages, cold["seconds"]), "mb_per_sec": rate(total_bytes / 1e6, cold["seconds"])})
+    if cold["exit_code"] != 0:
+        return {"workers": args.workers, "cold": cold}
+    # second run: every file is unchanged and skipped via the manifest
+    incremental = run_process("ingest_pdf_incremental", cmd, ws, offline_env(), args.log_dir, args.stage_timeout)
+    return {"workers": args.workers, "cold": cold, "incremental": incremental}
+
+
+def bench_ingest_web(ws, args):
+    site_dir = os.path.join(ws, "site")
+    out_dir = os.path.join(ws, "data", "web_text")
+    pages = generate_site(site_dir, args.web_pages)
+    server, base_url = serve_directory(site_dir)
+    try:
+        cmd = [sys.executable, os.path.join(SCRIPTS_DIR, "ingest_web.py"), f"{base_url}/index.html",
+               "--output-dir", out_dir, "--workers", str(args.web_workers), "--delay", "0",
+               "--discover", "--max-pages", str(pages)]
+        cold = run_process("ingest_web", cmd, ws, offline_env(), args.log_dir, args.stage_timeout)
+        saved = len([n for n in os.listdir(out_dir) if n.endswith(".txt")]) if os.path.isdir(out_dir) else 0
+        cold.update({"pages": pages, "saved": saved, "pages_per_sec": rate(pages, cold["seconds"])})
+        if cold["exit_code"] != 0:
+            return {"workers": args.web_workers, "cold": cold}
+        # second run: conditional GETs, the fixture server answers 304 Not Modified
+        incremental = run_process("ingest_web_incremental", cmd, ws, offline_env(), args.log_dir, args.stage_timeout)
+        incremental["pages_per_sec"] = rate(pages, incremental["seconds"])
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {"workers": args.web_workers, "cold": cold, "incremental": incremental}
+
+
+def bench_build_vectordb(ws, args):
+    # build_vectordb.py resolves ../data and ../backend relative to its working directory
+    cwd = os.path.join(ws, "scripts")
+    os.makedirs(cwd, exist_ok=True)
+    db_dir = os.path.join(ws, "backend", "db")
+    cache_path = os.path.join(ws, "backend", "embedding_cache.sqlite")
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, "build_vectordb.py"), "--workers", str(args.workers)]
+    if args.export_numpy:
+        cmd.append("--export-numpy")
+    if args.export_lexical:
+        cmd.append("--export-lexical")
+    cold = run_process("build_vectordb", cmd + ["--full"], cwd, offline_env(), args.log_dir, args.stage_timeout)
+
+    chunks = 0
+    manifest_path = os.path.join(db_dir, "build_manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            chunks = sum(len(entry.get("chunk_ids", [])) for entry in json.load(f).get("files", {}).values())
+    cold.update({"chunks": chunks, "chunks_per_sec": rate(chunks, cold["seconds"])})
+    if cold["exit_code"] != 0:
+        return {"workers": args.workers, "cold": cold}
+    # no source changes: only hashing + manifest comparison
+    incremental = run_process("build_vectordb_incremental", cmd, cwd, offline_env(), args.log_dir, args.stage_timeout)
+    return {"workers": args.workers, "cold": cold, "incremental": incremental}
+
+
+# --- Query stages ---
+def backend_env(ws, args, **overrides):
+    settings = {
+        "CHROMA_PERSIST_DIR": os.path.join(ws, "backend", "db"),
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": args.llm_latency_ms,
+        "ANSWER_CACHE_ENABLED": "1" if args.answer_cache else "0",
+    }
+    settings.update(overrides)
+    return offline_env(**settings)
+
+
+def bench_retrieval(ws, args):
+    """Embed + search + context build, in-process and without the HTTP layer or the LLM."""
+    # main.py reads its configuration from the environment; restore it afterwards so
+    # these settings don't leak into the server started by the query stage
+    saved_env = dict(os.environ)
+    os.environ.update(backend_env(ws, args, EMBED_BATCHING_ENABLED="0"))
+    try:
+        return _bench_retrieval(args)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def _bench_retrieval(args):
+    sys.path.insert(0, BACKEND_DIR)
+    import main as backend
+
+    started = time.perf_counter()
+    if not backend.init_vectorstore_and_embeddings():
+        return {"error": "vector store / embeddings failed to initialize"}
+    load_seconds = time.perf_counter() - started
+    for query in QUERIES[:3]:  # first-inference costs
+        backend.retrieve_context(query)
+
+    embed, search, total = [], [], []
+    for i in range(args.retrieval_iterations):
+        query = QUERIES[i % len(QUERIES)]
+        t0 = time.perf_counter()
+        vector = backend.embeddings.embed_query(query)
+        t1 = time.perf_counter()
+        backend.vectordb.similarity_search_by_vector(vector, k=backend.RETRIEVE_K)
+        t2 = time.perf_counter()
+        backend.retrieve_context(query, backend.RETRIEVE_K, vector)
+        t3 = time.perf_counter()
+        embed.append(t1 - t0)
+        search.append(t2 - t1)
+        total.append((t1 - t0) + (t3 - t2))
+    return {
+        "backend": backend.RETRIEVAL_BACKEND,
+        "hybrid": backend.lexical_index is not None,
+        "load_seconds": round(load_seconds, 3),
+        "embed": latency_summary(embed),
+        "search": latency_summary(search),
+        "retrieve_context": latency_summary(total),
+    }
+
+
+def _read_peak_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _stage_means(metrics_text):
+    """Mean seconds per pipeline stage from the server's /metrics histograms."""
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        for suffix, target in (("_sum", sums), ("_count", counts)):
+            prefix = f"nitai_stage_seconds{suffix}{{stage=\""
+            if line.startswith(prefix):
+                stage = line[len(prefix):line.index('"', len(prefix))]
+                target[stage] = float(line.rsplit(" ", 1)[1])
+    return {stage: round(sums[stage] / counts[stage] * 1000.0, 3) for stage in sums if counts.get(stage)}
+
+
+async def _load_level(client, concurrency, n_requests):
+    latencies, errors = [], 0
+    counter = iter(range(n_requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                resp = await client.post("/api/query", json={"query": QUERIES[i % len(QUERIES)]})
+                ok = resp.status_code == 200 and resp.json().get("source") != "Error"
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"concurrency": concurrency, "requests": n_requests, "errors": errors, "seconds": round(elapsed, 3),
+            "throughput_rps": rate(len(latencies), elapsed), **latency_summary(latencies)}
+
+
+async def _run_query_load(base_url, levels, n_requests):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        await _load_level(client, 1, min(len(QUERIES), n_requests))  # warm-up, not reported
+        results = []
+        for concurrency in levels:
+            result = await _load_level(client, concurrency, n_requests)
+            print(f"  c={concurrency}: p50 {result.get('p50_ms')} ms, p99 {result.get('p99_ms')} ms, "
+                  f"{result['throughput_rps']} req/s, {result['errors']} errors")
+            results.append(result)
+        metrics_text = (await client.get("/metrics")).text
+    return results, metrics_text
+
+
+def bench_query(ws, args):
+    import httpx
+
+    port = args.port
+    log_path = os.path.join(args.log_dir, "server.log")
+    env = backend_env(ws, args, WARMUP_ON_STARTUP="1")
+    with open(log_path, "w", encoding="utf-8") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + args.server_timeout
+        ready = False
+        while time.monotonic() < deadline and server.poll() is None:
+            try:
+                if httpx.get(f"{base_url}/health/ready", timeout=2.0).status_code == 200:
+                    ready = True
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        if not ready:
+            return {"error": f"server not ready after {args.server_timeout:.0f}s", "log": log_path}
+
+        levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+        results, metrics_text = asyncio.run(_run_query_load(base_url, levels, args.requests))
+        return {
+            "llm_latency_ms": args.llm_latency_ms,
+            "answer_cache": args.answer_cache,
+            "levels": results,
+            "server_stage_mean_ms": _stage_means(metrics_text),
+            "server_peak_rss_mb": _read_peak_rss_mb(server.pid),
+            "log": log_path,
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for ingestion and the query API.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {', '.join(STAGES)}.")
+    parser.add_argument("--workspace", default=None, help="Working directory (default: a temp dir, removed afterwards).")
+    parser.add_argument("--keep-workspace", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Workers for ingest_pdf/build_vectordb.")
+    parser.add_argument("--web-workers", type=int, default=8)
+    parser.add_argument("--pdf-copies", type=int, default=PDF_COPIES)
+    parser.add_argument("--web-pages", type=int, default=WEB_PAGES)
+    parser.add_argument("--export-numpy", action="store_true", help="Also time the numpy index export.")
+    parser.add_argument("--export-lexical", action="store_true", help="Also time the lexical index export.")
+    parser.add_argument("--concurrency", default=CONCURRENCY_LEVELS, help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL, help="Requests per concurrency level.")
+    parser.add_argument("--retrieval-iterations", type=int, default=RETRIEVAL_ITERATIONS)
+    parser.add_argument("--llm-latency-ms", type=float, default=FAKE_LLM_LATENCY_MS)
+    parser.add_argument("--answer-cache", action="store_true", help="Leave the semantic answer cache on.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-timeout", type=float, default=SERVER_START_TIMEOUT)
+    parser.add_argument("--stage-timeout", type=float, default=STAGE_TIMEOUT, help="Seconds before a script run is killed.")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    ws = os.path.abspath(args.workspace) if args.workspace else tempfile.mkdtemp(prefix="nitai-bench-")
+    args.log_dir = os.path.join(ws, "logs")
+    os.makedirs(args.log_dir, exist_ok=True)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workspace": ws,
+            "args": {k: v for k, v in vars(args).items() if k != "log_dir"},
+        },
+    }
+    runners = {
+        "ingest_pdf": bench_ingest_pdf,
+        "ingest_web": bench_ingest_web,
+        "build_vectordb": bench_build_vectordb,
+        "retrieval": bench_retrieval,
+        "query": bench_query,
+    }
+    try:
+        # in STAGES order: each stage feeds the next (text -> vector DB -> queries)
+        for stage in (s for s in STAGES if s in stages):
+            print(f"Running {stage}...")
+            try:
+                results[stage] = runners[stage](ws, args)
+            except Exception as e:
+                print(f"  {stage} failed: {e!r}")
+                results[stage] = {"error": repr(e)}
+    finally:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+        if not args.workspace and not args.keep_workspace:
+            shutil.rmtree(ws, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
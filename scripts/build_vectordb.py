@@ -1,98 +1,726 @@
 import os
+import re
+import sys
 import glob
+import time
+import json
 import shutil
+import sqlite3
+import bisect
+import hashlib
+import argparse
+import multiprocessing
+from array import array
+from collections import deque
 from langchain_core.documents import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # --- Configuration (Filled In) ---
 # Read from the output of our other scripts
 TEXT_DATA_DIRS = ["../data/web_text", "../data/pdf_text"]
 
-# Chunking parameters from the proposal [8, 1]
+# Chunking parameters from the proposal
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
-# Embedding model from the proposal [3, 4, 1]
+# Embedding model from the proposal
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Same switches as the API server (see backend/embedding_backends.py); build the index
+# with the backend you serve with so document and query vectors come from one model
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR") or None
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "0") == "1"
+
 # Database path (inside the backend folder)
 PERSIST_DIRECTORY = '../backend/db'
 
+# Collection name used by langchain_community's Chroma wrapper (what backend/main.py opens)
+COLLECTION_NAME = "langchain"
+
+# Per-file content hashes and chunk ids of the last build (lives inside the DB folder)
+MANIFEST_PATH = os.path.join(PERSIST_DIRECTORY, "build_manifest.json")
+
+# Embedding cache keyed by (model name, chunk hash); kept outside the DB folder
+# so it survives a --full rebuild.
+EMBEDDING_CACHE_PATH = '../backend/embedding_cache.sqlite'
+
+# Bump when the metadata attached to chunks changes, to re-index everything
+METADATA_VERSION = 3
+
+# Page-offset sidecar written by ingest_pdf.py next to each PDF's .txt
+PAGES_SUFFIX = ".pages.json"
+# URL/title/date sidecar written by ingest_web.py next to each page's .txt
+META_SUFFIX = ".meta.json"
+
+# Structured metadata recorded on every chunk, so queries can be pre-filtered
+# (backend/metadata_filters.py): doc_type, department, category, date (int YYYYMMDD),
+# year, page (PDFs), title and content_hash (of the whole source document).
+# Department and category are the first entry whose keywords occur in the source
+# name/URL or title; short department codes must appear as whole words.
+DEPARTMENTS = {
+    "cse": ("computer science", "cse"),
+    "ece": ("electronics and communication", "ece"),
+    "eie": ("electronics and instrumentation", "instrumentation", "eie"),
+    "ee": ("electrical engineering",),
+    "me": ("mechanical",),
+    "ce": ("civil engineering",),
+    "che": ("chemical engineering",),
+    "pe": ("production engineering",),
+    "bioengineering": ("bioengineering", "bio engineering", "biotechnology"),
+    "mathematics": ("mathematics", "maths"),
+    "physics": ("physics",),
+    "chemistry": ("chemistry",),
+    "hss": ("humanities", "social sciences", "hss"),
+    "management": ("management", "mba"),
+}
+CATEGORIES = {
+    "syllabus": ("syllabus", "curriculum", "course structure"),
+    "academic_calendar": ("academic calendar",),
+    "notice": ("notice", "circular", "announcement", "notification"),
+    "examination": ("examination", "exam schedule", "result"),
+    "admission": ("admission",),
+    "recruitment": ("recruitment", "vacancy", "advertisement"),
+    "tender": ("tender",),
+}
+_YEAR_RE = re.compile(r"(?<!\d)(?:199\d|20\d\d)(?!\d)")
+
+# Max records per Chroma upsert/delete call
+WRITE_BATCH_SIZE = 256
+
+# Streaming pipeline: chunks per embedding/write batch and embedding worker processes.
+# Every worker loads its own copy of the model (a few hundred MB of RAM each) and gets
+# cpu_count // workers torch threads, so a few workers already use every core.
+BATCH_SIZE = 256
+EMBED_WORKERS = min(4, os.cpu_count() or 1)
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+
+# Memory-mapped index for RETRIEVAL_BACKEND=numpy (backend/vector_index.py)
+NUMPY_INDEX_DIRECTORY = os.path.join(PERSIST_DIRECTORY, "numpy_index")
+# BM25 inverted index for HYBRID_RETRIEVAL=1 (backend/lexical_index.py)
+LEXICAL_INDEX_DIRECTORY = os.path.join(PERSIST_DIRECTORY, "lexical_index")
+EXPORT_PAGE_SIZE = 1000
+
+# backend/ holds the index formats shared with the API server
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_hash(text_file):
+    """Hash of a text file and its sidecars, so new page offsets or dates re-index it too."""
+    sidecars = [p for p in (text_file + PAGES_SUFFIX, text_file + META_SUFFIX) if os.path.exists(p)]
+    if not sidecars:
+        return sha256_file(text_file)
+    h = hashlib.sha256()
+    for path in [text_file] + sidecars:
+        h.update(sha256_file(path).encode("ascii"))
+    return h.hexdigest()
+
+
+# --- Embedding cache ---
+class EmbeddingCache:
+    """Persistent (model, chunk hash) -> float32 vector store backed by SQLite."""
+
+    def __init__(self, path, model_name):
+        self.model_name = model_name
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, chunk_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, chunk_hash))"
+        )
+        self.conn.commit()
+
+    def get_many(self, chunk_hashes):
+        found = {}
+        unique = list(set(chunk_hashes))
+        for i in range(0, len(unique), 500):
+            part = unique[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self.conn.execute(
+                f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                [self.model_name, *part],
+            )
+            for chunk_hash, blob in rows:
+                vec = array("f")
+                vec.frombytes(blob)
+                found[chunk_hash] = vec.tolist()
+        return found
+
+    def put_many(self, items):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)",
+            [(self.model_name, h, array("f", vec).tobytes()) for h, vec in items],
+        )
+        self.conn.commit()
+
+    def delete_many(self, chunk_hashes):
+        """Drop the vectors of these chunk hashes (for every model)."""
+        hashes = list(chunk_hashes)
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            self.conn.execute(f"DELETE FROM embeddings WHERE chunk_hash IN ({','.join('?' * len(part))})", part)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
 # --- Loading Logic ---
-print("Loading ingested text data...")
-all_docs = []
-
-for data_dir in TEXT_DATA_DIRS:
-    print(f"--- Loading from: {data_dir} ---")
-    text_files = glob.glob(os.path.join(data_dir, "*.txt"))
-    
-    if not text_files:
-        print(f"Warning: No.txt files found in {data_dir}")
-        continue
-        
-    for text_file in text_files:
-        with open(text_file, "r", encoding="utf-8") as f:
-            # First line is metadata (e.g., "Source URL:...")
-            source_line = f.readline().strip()
-            content = f.read()
-            
-            # Use the first line as the 'source' metadata
-            source_id = source_line.split(":", 1)[-1].strip()
-            
-            # Create a Document object
-            doc = Document(page_content=content, metadata={"source": source_id})
-            all_docs.append(doc)
-
-print(f"\nLoaded {len(all_docs)} raw documents.")
-
-if not all_docs:
-    print("No documents found to process. Halting build.")
-    print("Please add PDFs to 'data/pdfs' and configure/run 'ingest_web.py'.")
-    exit()
-
-# --- Chunking Logic ---
-print("Chunking documents...")
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=CHUNK_SIZE,
-    chunk_overlap=CHUNK_OVERLAP,
-    length_function=len,
-    is_separator_regex=False,
-    separators=["\n\n", "\n", ". ", " ", ""] # [8]
-)
-
-split_documents = text_splitter.split_documents(all_docs)
-print(f"Created {len(split_documents)} text chunks.")
+def iter_text_files():
+    for data_dir in TEXT_DATA_DIRS:
+        print(f"--- Loading from: {data_dir} ---")
+        text_files = sorted(glob.glob(os.path.join(data_dir, "*.txt")))
+
+        if not text_files:
+            print(f"Warning: No .txt files found in {data_dir}")
+            continue
+
+        for text_file in text_files:
+            yield os.path.normpath(text_file)
+
+
+def load_sidecar(text_file):
+    """Document info written by the ingest scripts (title, date, ...), or {}."""
+    for suffix in (PAGES_SUFFIX, META_SUFFIX):
+        if os.path.exists(text_file + suffix):
+            with open(text_file + suffix, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return {}
+
+
+def _first_match(table, text):
+    words = set(re.findall(r"[a-z0-9]+", text))
+    for key, keywords in table.items():
+        for keyword in keywords:
+            if (" " in keyword or len(keyword) > 4) and keyword in text:
+                return key
+            if keyword in words:
+                return key
+    return None
+
+
+def document_metadata(source_id, doc_type, content, sidecar):
+    """Structured, filterable metadata shared by every chunk of one source document."""
+    date_to_int = _import_backend_module("metadata_filters").date_to_int
+
+    title = (sidecar.get("title") or "").strip()
+    # "FinalSyllabus_1stYear_2021.pdf" / "https://x/notices/exam-schedule" -> plain words
+    text = re.sub(r"[^a-z0-9]+", " ", f"{source_id} {title}".lower())
+    meta = {"doc_type": doc_type, "content_hash": sha256_text(content)}
+    if title:
+        meta["title"] = title
+    for field, table in (("department", DEPARTMENTS), ("category", CATEGORIES)):
+        value = _first_match(table, text)
+        if value:
+            meta[field] = value
+    date = date_to_int(sidecar.get("date"))
+    if date:
+        meta["date"] = date
+        meta["year"] = date // 10000
+    else:
+        # no document date: fall back to a year in the file name / URL
+        years = _YEAR_RE.findall(source_id)
+        if years:
+            meta["year"] = int(years[-1])
+    return meta
+
+
+def load_document(text_file):
+    with open(text_file, "r", encoding="utf-8") as f:
+        # First line is metadata (e.g., "Source URL:...")
+        source_line = f.readline().strip()
+        content = f.read()
+
+    # Use the first line as the 'source' metadata
+    label, _, source_id = source_line.partition(":")
+    source_id = source_id.strip()
+    doc_type = "pdf" if "pdf" in label.lower() else "web"
+    metadata = {"source": source_id, "source_file": text_file,
+                **document_metadata(source_id, doc_type, content, load_sidecar(text_file))}
+    return Document(page_content=content, metadata=metadata)
+
+
+def load_page_offsets(text_file):
+    """Start offset of each page for PDF text extracted by ingest_pdf.py, or None."""
+    pages_file = text_file + PAGES_SUFFIX
+    if not os.path.exists(pages_file):
+        return None
+    with open(pages_file, "r", encoding="utf-8") as f:
+        return json.load(f).get("page_offsets") or None
+
+
+def chunk_document(text_splitter, doc, page_offsets=None):
+    """
+    Split one document and return (ids, chunk hashes, texts, metadatas).
+    With `page_offsets`, each chunk's metadata gets the 1-based page it starts on.
+    """
+    ids, hashes, texts, metadatas = [], [], [], []
+    seen = {}
+    for chunk in text_splitter.split_documents([doc]):
+        chunk_hash = sha256_text(chunk.page_content)
+        # identical text can repeat inside a file; number the repeats to keep ids unique
+        n = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = n + 1
+        meta = dict(chunk.metadata)
+        meta["chunk_hash"] = chunk_hash
+        if page_offsets and meta.get("start_index", -1) >= 0:
+            meta["page"] = max(1, bisect.bisect_right(page_offsets, meta["start_index"]))
+        ids.append(sha256_text(f"{meta['source_file']}\0{meta['source']}\0{chunk_hash}\0{n}"))
+        hashes.append(chunk_hash)
+        texts.append(chunk.page_content)
+        metadatas.append(meta)
+    return ids, hashes, texts, metadatas
+
+
+def load_manifest(settings):
+    if not os.path.exists(MANIFEST_PATH):
+        return {"settings": settings, "files": {}}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("settings") != settings:
+        print("Model or chunking settings changed since last build; re-indexing every file.")
+        manifest = {"settings": settings, "files": {}, "stale_ids": [
+            cid for entry in manifest.get("files", {}).values() for cid in entry.get("chunk_ids", [])
+        ]}
+    return manifest
+
+
+def save_manifest(manifest):
+    manifest.pop("stale_ids", None)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, MANIFEST_PATH)
+
 
 # --- Embedding Model Logic ---
-print(f"Loading embedding model: '{EMBEDDING_MODEL}'...")
-model_kwargs = {'device': 'cpu'} 
-encode_kwargs = {'normalize_embeddings': False}
-
-embeddings = HuggingFaceEmbeddings(
-    model_name=EMBEDDING_MODEL,
-    model_kwargs=model_kwargs,
-    encode_kwargs=encode_kwargs
-) [3, 4]
-print("Embedding model loaded.")
-
-# --- Vector Store Logic ---
-if os.path.exists(PERSIST_DIRECTORY):
-    print(f"Cleaning up old database at '{PERSIST_DIRECTORY}'...")
-    shutil.rmtree(PERSIST_DIRECTORY)
-
-print(f"Building persistent ChromaDB in '{PERSIST_DIRECTORY}'...")
-
-# This command builds the entire vector database [9, 10]
-db = Chroma.from_documents(
-    documents=split_documents, 
-    embedding=embeddings, 
-    persist_directory=PERSIST_DIRECTORY
-)
-
-print("\n-------------------------------------------------")
-print("Vector database built successfully.")
-print(f"Total chunks indexed: {len(split_documents)}")
-print(f"Database location: {PERSIST_DIRECTORY}")
-print("-------------------------------------------------")
\ No newline at end of file
+def embedding_model_id():
+    """Model identity stored in the manifest, cache and numpy index (bare name for huggingface)."""
+    return _import_backend_module("embedding_backends").embedding_model_id(
+        EMBEDDING_MODEL, EMBEDDING_BACKEND, ONNX_QUANTIZED
+    )
+
+
+def load_embeddings(threads=0):
+    return _import_backend_module("embedding_backends").load_embeddings(
+        EMBEDDING_MODEL, EMBEDDING_BACKEND, device="cpu",
+        onnx_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, threads=threads,
+    )
+
+
+_worker_embeddings = None  # model loaded once per worker process
+
+
+def _init_embed_worker(threads_per_worker):
+    global _worker_embeddings
+    try:
+        # Keep workers x intra-op threads at about one thread per core
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    _worker_embeddings = load_embeddings(threads=threads_per_worker)
+
+
+def _embed_in_worker(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+# --- Streaming pipeline ---
+class FileTracker:
+    """
+    Records a source file in the manifest only once every one of its chunks
+    has been written, since a file's chunks can span several in-flight batches.
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.pending = {}
+        self.deleted = 0
+
+    def begin_file(self, text_file, entry, n_chunks, n_obsolete):
+        self.deleted += n_obsolete
+        self.pending[text_file] = [entry, n_chunks, n_obsolete]
+        if n_chunks == 0:
+            self._finish(text_file)
+
+    def chunks_written(self, batch):
+        for text_file, *_ in batch:
+            state = self.pending[text_file]
+            state[1] -= 1
+            if state[1] == 0:
+                self._finish(text_file)
+
+    def _finish(self, text_file):
+        entry, _, n_obsolete = self.pending.pop(text_file)
+        self.files[text_file] = entry
+        print(f"  Indexed: {text_file} ({len(entry['chunk_ids'])} chunks, {n_obsolete} obsolete removed)")
+
+
+class Progress:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.written = 0
+        self.embedded = 0
+
+    def add(self, n_written, n_embedded):
+        self.written += n_written
+        self.embedded += n_embedded
+        now = time.perf_counter()
+        if now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            print(f"  ... {self.written} chunks written, {self.embedded} embedded ({self.rate():.1f} chunks/sec)")
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def rate(self):
+        elapsed = self.elapsed()
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+
+def iter_pending_chunks(changed, old_files, text_splitter, collection, tracker, dropped_hashes):
+    """
+    Yield (source file, id, chunk hash, text, metadata) for every chunk that must be
+    (re)written. Only one source file is held in memory at a time. Hashes of deleted
+    chunks are added to `dropped_hashes`.
+    """
+    for text_file, file_hash in changed:
+        ids, hashes, texts, metadatas = chunk_document(
+            text_splitter, load_document(text_file), load_page_offsets(text_file)
+        )
+
+        previous_ids = set(old_files.get(text_file, {}).get("chunk_ids", []))
+        current_ids = set(ids)
+        obsolete = [cid for cid in previous_ids if cid not in current_ids]
+        delete_ids(collection, obsolete, dropped_hashes)
+
+        # Unchanged chunks keep their id and vector; only their document-level
+        # metadata (content hash, date, ...) may have changed
+        unchanged = [i for i, cid in enumerate(ids) if cid in previous_ids]
+        update_metadatas(collection, [ids[i] for i in unchanged], [metadatas[i] for i in unchanged])
+        keep = [i for i, cid in enumerate(ids) if cid not in previous_ids]
+        tracker.begin_file(text_file, {"hash": file_hash, "chunk_ids": ids}, len(keep), len(obsolete))
+        for i in keep:
+            yield text_file, ids[i], hashes[i], texts[i], metadatas[i]
+
+
+def iter_batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_pipeline(batches, collection, cache, submit_embed, max_inflight, tracker, progress):
+    """
+    For each batch: look up cached vectors, hand the misses to `submit_embed`
+    (which returns a callable producing the vectors), then upsert into Chroma.
+    At most `max_inflight` batches are outstanding, which bounds memory.
+    """
+    pending = deque()
+
+    def write_oldest():
+        batch, vectors, missing_hashes, get_result = pending.popleft()
+        if get_result is not None:
+            fresh = list(zip(missing_hashes, get_result()))
+            cache.put_many(fresh)
+            vectors.update(fresh)
+        collection.upsert(
+            ids=[r[1] for r in batch],
+            embeddings=[vectors[r[2]] for r in batch],
+            documents=[r[3] for r in batch],
+            metadatas=[r[4] for r in batch],
+        )
+        tracker.chunks_written(batch)
+        progress.add(len(batch), len(missing_hashes))
+
+    for batch in batches:
+        vectors = cache.get_many([r[2] for r in batch])
+        missing = {}
+        for _, _, chunk_hash, text, _ in batch:
+            if chunk_hash not in vectors and chunk_hash not in missing:
+                missing[chunk_hash] = text
+        get_result = submit_embed(list(missing.values())) if missing else None
+        pending.append((batch, vectors, list(missing.keys()), get_result))
+        while len(pending) > max_inflight:
+            write_oldest()
+    while pending:
+        write_oldest()
+
+
+def delete_ids(collection, ids, dropped_hashes=None):
+    """Delete chunks by id; their chunk hashes are added to `dropped_hashes` if given."""
+    for i in range(0, len(ids), WRITE_BATCH_SIZE):
+        part = ids[i:i + WRITE_BATCH_SIZE]
+        if dropped_hashes is not None:
+            for meta in collection.get(ids=part, include=["metadatas"])["metadatas"]:
+                if meta and meta.get("chunk_hash"):
+                    dropped_hashes.add(meta["chunk_hash"])
+        collection.delete(ids=part)
+
+
+def prune_embedding_cache(collection, cache, chunk_hashes):
+    """
+    Drop cached vectors of deleted chunks, except hashes that another chunk in the
+    collection still has (the same text in another file). Returns how many were dropped.
+    """
+    hashes = sorted(chunk_hashes)
+    still_used = set()
+    for i in range(0, len(hashes), 500):
+        page = collection.get(where={"chunk_hash": {"$in": hashes[i:i + 500]}}, include=["metadatas"])
+        still_used.update(meta["chunk_hash"] for meta in page["metadatas"] if meta)
+    unused = [h for h in hashes if h not in still_used]
+    cache.delete_many(unused)
+    return len(unused)
+
+
+def update_metadatas(collection, ids, metadatas):
+    """
+    Replace the metadata of existing chunks. Chroma merges metadata on update (and
+    upsert), so keys the new metadata no longer has are cleared with None; otherwise
+    a date or page dropped by a metadata rebuild would still match filters.
+    """
+    for i in range(0, len(ids), WRITE_BATCH_SIZE):
+        part = ids[i:i + WRITE_BATCH_SIZE]
+        stored = collection.get(ids=part, include=["metadatas"])
+        old = dict(zip(stored["ids"], stored["metadatas"]))
+        replaced = []
+        for cid, meta in zip(part, metadatas[i:i + WRITE_BATCH_SIZE]):
+            cleared = {key: None for key in (old.get(cid) or {}) if key not in meta}
+            replaced.append({**cleared, **meta})
+        collection.update(ids=part, metadatas=replaced)
+
+
+def iter_collection(collection, include):
+    """Page through every record in the collection."""
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=EXPORT_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def _import_backend_module(name):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return __import__(name)
+
+
+def export_numpy_index(collection, path, dtype):
+    VectorIndexWriter = _import_backend_module("vector_index").VectorIndexWriter
+
+    count = collection.count()
+    if count == 0:
+        print("Collection is empty; skipping numpy index export.")
+        return
+    print(f"Exporting {count} chunks to numpy index '{path}' ({dtype})...")
+    started = time.perf_counter()
+    writer = None
+    for page in iter_collection(collection, ["embeddings", "documents", "metadatas"]):
+        if writer is None:
+            dim = len(page["embeddings"][0])
+            writer = VectorIndexWriter(path, count, dim, dtype=dtype, model=embedding_model_id())
+        writer.add(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+    writer.close()
+    print(f"Numpy index written in {time.perf_counter() - started:.1f}s.")
+
+
+def export_lexical_index(collection, path):
+    build_lexical_index = _import_backend_module("lexical_index").build_lexical_index
+
+    print(f"Building lexical (BM25) index '{path}'...")
+    started = time.perf_counter()
+    records = (
+        (chunk_id, text, meta)
+        for page in iter_collection(collection, ["documents", "metadatas"])
+        for chunk_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"])
+    )
+    count = build_lexical_index(path, records)
+    print(f"Lexical index over {count} chunks written in {time.perf_counter() - started:.1f}s.")
+
+
+def export_indexes(collection, args):
+    if args.export_numpy:
+        export_numpy_index(collection, args.numpy_dir, args.numpy_dtype)
+    if args.export_lexical:
+        export_lexical_index(collection, args.lexical_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or incrementally update the Chroma vector DB.")
+    parser.add_argument("--full", action="store_true", help="Delete the existing DB and rebuild everything.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Chunks per embedding/write batch.")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS,
+                        help="Embedding worker processes, each holding a model copy (1 = embed in this process).")
+    parser.add_argument("--export-numpy", action="store_true",
+                        help="Also export the collection as a memory-mapped numpy index (RETRIEVAL_BACKEND=numpy).")
+    parser.add_argument("--numpy-dir", default=NUMPY_INDEX_DIRECTORY)
+    parser.add_argument("--numpy-dtype", choices=("float32", "float16", "int8"), default="float32",
+                        help="Storage type of the numpy index vectors.")
+    parser.add_argument("--export-lexical", action="store_true",
+                        help="Also build the BM25 inverted index used by HYBRID_RETRIEVAL=1.")
+    parser.add_argument("--lexical-dir", default=LEXICAL_INDEX_DIRECTORY)
+    args = parser.parse_args()
+    batch_size = max(1, args.batch_size)
+    workers = max(1, args.workers)
+
+    import chromadb
+
+    if args.full and os.path.exists(PERSIST_DIRECTORY):
+        print(f"Cleaning up old database at '{PERSIST_DIRECTORY}'...")
+        shutil.rmtree(PERSIST_DIRECTORY)
+    os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
+
+    model_id = embedding_model_id()
+    # a different backend gives slightly different vectors, so switching re-indexes everything
+    settings = {"model": model_id, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+                "metadata_version": METADATA_VERSION}
+    manifest = load_manifest(settings)
+    old_files = manifest["files"]
+    new_files = {}
+
+    # --- Work out what changed ---
+    print("Scanning ingested text data...")
+    changed = []
+    for text_file in iter_text_files():
+        file_hash = source_hash(text_file)
+        previous = old_files.get(text_file)
+        if previous and previous.get("hash") == file_hash:
+            new_files[text_file] = previous
+        else:
+            changed.append((text_file, file_hash))
+    changed_paths = {path for path, _ in changed}
+    removed = [path for path in old_files if path not in new_files and path not in changed_paths]
+
+    print(f"\n{len(new_files)} unchanged, {len(changed)} new/changed, {len(removed)} removed source file(s).")
+
+    if not new_files and not changed and not removed:
+        print("No documents found to process. Halting build.")
+        print("Please add PDFs to 'data/pdfs' and configure/run 'ingest_web.py'.")
+        sys.exit()
+
+    client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+
+    # Hashes of every deleted chunk; their cached vectors are pruned after the build
+    dropped_hashes = set()
+
+    # Chunks left over from a build with different settings
+    stale_ids = manifest.get("stale_ids") or []
+    if stale_ids:
+        delete_ids(collection, stale_ids, dropped_hashes)
+
+    # --- Drop chunks whose source disappeared ---
+    deleted_chunks = 0
+    for path in removed:
+        ids = old_files[path].get("chunk_ids", [])
+        delete_ids(collection, ids, dropped_hashes)
+        deleted_chunks += len(ids)
+        print(f"  Removed: {path} ({len(ids)} chunks)")
+
+    if not changed:
+        save_manifest({"settings": settings, "files": new_files})
+        if dropped_hashes:
+            cache = EmbeddingCache(EMBEDDING_CACHE_PATH, model_id)
+            try:
+                print(f"Pruned {prune_embedding_cache(collection, cache, dropped_hashes)} unused cached embedding(s).")
+            finally:
+                cache.close()
+        export_indexes(collection, args)
+        print("\n-------------------------------------------------")
+        print("Vector database is up to date.")
+        print(f"Chunks deleted: {deleted_chunks}")
+        print(f"Database location: {PERSIST_DIRECTORY}")
+        print("-------------------------------------------------")
+        return
+
+    # --- Chunking + Embedding Logic ---
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+        is_separator_regex=False,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        add_start_index=True,
+    )
+
+    # Until a changed file is re-indexed, its old entry still describes what is in the collection
+    for text_file, _ in changed:
+        if text_file in old_files:
+            new_files[text_file] = old_files[text_file]
+
+    cache = EmbeddingCache(EMBEDDING_CACHE_PATH, model_id)
+    tracker = FileTracker(new_files)
+    # Model/pool are created on the first cache miss, so cache-only runs never load the model
+    worker_state = {}
+    try:
+        def start_embedding():
+            print(f"Loading embedding model: '{model_id}' ({workers} worker(s), batch size {batch_size})...")
+            if workers == 1:
+                worker_state["embeddings"] = load_embeddings()
+            else:
+                # spawn, not fork: the parent already holds an open Chroma/SQLite client
+                threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+                worker_state["pool"] = multiprocessing.get_context("spawn").Pool(
+                    workers, initializer=_init_embed_worker, initargs=(threads_per_worker,)
+                )
+
+        def submit_embed(texts):
+            if not worker_state:
+                start_embedding()
+            if workers == 1:
+                vectors = worker_state["embeddings"].embed_documents(texts)
+                return lambda: vectors
+            return worker_state["pool"].apply_async(_embed_in_worker, (texts,)).get
+
+        progress = Progress()
+        records = iter_pending_chunks(changed, old_files, text_splitter, collection, tracker, dropped_hashes)
+        run_pipeline(iter_batches(records, batch_size), collection, cache, submit_embed,
+                     max_inflight=workers * 2, tracker=tracker, progress=progress)
+        if dropped_hashes:
+            print(f"Pruned {prune_embedding_cache(collection, cache, dropped_hashes)} unused cached embedding(s).")
+    finally:
+        if "pool" in worker_state:
+            worker_state["pool"].terminate()
+        cache.close()
+        # Record progress even on failure so the next run resumes instead of starting over
+        save_manifest({"settings": settings, "files": new_files})
+    deleted_chunks += tracker.deleted
+    upserted_chunks = progress.written
+    embedded_chunks = progress.embedded
+    export_indexes(collection, args)
+
+    print("\n-------------------------------------------------")
+    print("Vector database updated successfully.")
+    print(f"Chunks upserted: {upserted_chunks} ({embedded_chunks} newly embedded, rest from cache)")
+    print(f"Chunks deleted: {deleted_chunks}")
+    print(f"Throughput: {progress.rate():.1f} chunks/sec over {progress.elapsed():.1f}s")
+    print(f"Total chunks indexed: {collection.count()}")
+    print(f"Database location: {PERSIST_DIRECTORY}")
+    print("-------------------------------------------------")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+# Compares the ONNX embedding backends with the PyTorch model before switching
+# EMBEDDING_BACKEND over.
+#
+#   python scripts/check_embedding_parity.py --output parity.json
+#
+# Embeds a sample of the indexed chunks and a set of queries with every backend and
+# reports, for each candidate against the huggingface reference:
+#   cosine          per-document similarity between candidate and reference vectors
+#   recall@k        overlap of the top-k chunks per query; "rebuilt" searches candidate
+#                   document vectors (index rebuilt with the candidate), "mixed" searches
+#                   the reference vectors (API switched, index not rebuilt yet)
+#   speed / memory  model load time, documents/sec and resident memory added by the model
+# Exits with status 1 when a candidate's rebuilt recall is below --min-recall.
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+PERSIST_DIRECTORY = "../backend/db"
+COLLECTION_NAME = "langchain"
+
+SAMPLE_SIZE = 2000
+TOP_K = 10
+MIN_RECALL = 0.95
+SEED = 1234
+
+QUERIES = [
+    "What is the syllabus for Mathematics-I?",
+    "Which topics are covered in MA101?",
+    "What are the credits for the first year physics course?",
+    "List the experiments in the chemistry laboratory.",
+    "What is taught in Basic Electrical Engineering?",
+    "Which textbooks are recommended for programming for problem solving?",
+    "What is the course outcome of engineering graphics?",
+    "When is the mid semester examination held?",
+    "Who is the head of the computer science department?",
+    "How do I apply for hostel accommodation?",
+    "What is the fee structure for B.Tech?",
+    "What research areas does the electronics department work on?",
+]
+
+# (label, backend, quantized)
+CONFIGS = [
+    ("huggingface", "huggingface", False),
+    ("onnx", "onnx", False),
+    ("onnx-int8", "onnx", True),
+]
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def _import_backend_module(name):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return __import__(name)
+
+
+def rss_mb():
+    """Current resident set size (Linux); None where /proc is unavailable."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def load_corpus(persist_directory, sample_size, seed):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(COLLECTION_NAME)
+    ids = collection.get(include=[])["ids"]
+    if len(ids) > sample_size:
+        ids = random.Random(seed).sample(ids, sample_size)
+    texts = []
+    for start in range(0, len(ids), 1000):
+        texts.extend(collection.get(ids=ids[start:start + 1000], include=["documents"])["documents"])
+    return [t for t in texts if t]
+
+
+def _as_unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def embed_with(label, backend, quantized, args, corpus, queries):
+    backends = _import_backend_module("embedding_backends")
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    model = backends.load_embeddings(args.model, backend, device="cpu", onnx_dir=args.onnx_dir,
+                                     quantized=quantized, threads=args.threads)
+    model.embed_documents(["warm-up query"])
+    load_s = time.perf_counter() - started
+    rss_after = rss_mb()
+
+    started = time.perf_counter()
+    doc_vectors = _as_unit(model.embed_documents(corpus))
+    embed_s = time.perf_counter() - started
+    query_vectors = _as_unit([model.embed_query(q) for q in queries])
+    stats = {
+        "model_id": backends.embedding_model_id(args.model, backend, quantized),
+        "load_s": round(load_s, 3),
+        "docs_per_sec": round(len(corpus) / embed_s, 1) if embed_s > 0 else None,
+        "rss_added_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+    }
+    print(f"  {label}: loaded in {load_s:.1f}s, {stats['docs_per_sec']} docs/sec")
+    return stats, doc_vectors, query_vectors
+
+
+def top_k(query_vectors, doc_vectors, k):
+    scores = query_vectors @ doc_vectors.T
+    k = min(k, doc_vectors.shape[0])
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def recall_at_k(found, expected):
+    hits = [len(set(f.tolist()) & set(e.tolist())) / len(e) for f, e in zip(found, expected)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ONNX embedding backends against the PyTorch model.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--onnx-dir", default=os.getenv("ONNX_MODEL_DIR") or None)
+    parser.add_argument("--db", default=PERSIST_DIRECTORY, help="Chroma directory the corpus is sampled from.")
+    parser.add_argument("--sample", type=int, default=SAMPLE_SIZE, help="Chunks sampled from the collection.")
+    parser.add_argument("--queries-file", default=None, help="Extra queries, one per line.")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0 = default).")
+    parser.add_argument("--min-recall", type=float, default=MIN_RECALL)
+    parser.add_argument("--output", default=None, help="Also write the report as JSON.")
+    args = parser.parse_args()
+
+    queries = list(QUERIES)
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries.extend(line.strip() for line in f if line.strip())
+
+    corpus = load_corpus(args.db, args.sample, SEED)
+    if not corpus:
+        print(f"No chunks found in '{args.db}'; run build_vectordb.py first.")
+        sys.exit(1)
+    print(f"Embedding {len(corpus)} chunks and {len(queries)} queries per backend...")
+
+    results = {}
+    reference = None
+    for label, backend, quantized in CONFIGS:
+        try:
+            stats, doc_vectors, query_vectors = embed_with(label, backend, quantized, args, corpus, queries)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"  {label}: skipped ({e})")
+            results[label] = {"skipped": str(e)}
+            continue
+        if reference is None:
+            if backend != "huggingface":
+                print("The huggingface reference could not be loaded; nothing to compare against.")
+                sys.exit(1)
+            reference = (doc_vectors, query_vectors, top_k(query_vectors, doc_vectors, args.k))
+        else:
+            ref_docs, ref_queries, expected = reference
+            cosine = (doc_vectors * ref_docs).sum(axis=1)
+            query_cosine = (query_vectors * ref_queries).sum(axis=1)
+            stats.update({
+                "cosine_mean": round(float(cosine.mean()), 6),
+                "cosine_min": round(float(cosine.min()), 6),
+                "query_cosine_min": round(float(query_cosine.min()), 6),
+                f"recall@{args.k}_rebuilt": round(recall_at_k(top_k(query_vectors, doc_vectors, args.k), expected), 4),
+                f"recall@{args.k}_mixed": round(recall_at_k(top_k(query_vectors, ref_docs, args.k), expected), 4),
+            })
+        results[label] = stats
+
+    print(f"\n{'backend':<12} {'load s':>7} {'docs/s':>8} {'RSS MB':>7} {'cos mean':>9} {'cos min':>8} "
+          f"{'rebuilt':>8} {'mixed':>7}")
+    failed = []
+    for label, stats in results.items():
+        if "skipped" in stats:
+            print(f"{label:<12} skipped")
+            continue
+        rebuilt = stats.get(f"recall@{args.k}_rebuilt")
+        print(f"{label:<12} {stats['load_s']:>7} {stats['docs_per_sec']!s:>8} {stats['rss_added_mb']!s:>7} "
+              f"{stats.get('cosine_mean', '-')!s:>9} {stats.get('cosine_min', '-')!s:>8} "
+              f"{rebuilt if rebuilt is not None else '-'!s:>8} {stats.get(f'recall@{args.k}_mixed', '-')!s:>7}")
+        if rebuilt is not None and rebuilt < args.min_recall:
+            failed.append(label)
+
+    if args.output:
+        report = {"model": args.model, "chunks": len(corpus), "queries": len(queries), "k": args.k,
+                  "min_recall": args.min_recall, "backends": results}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if failed:
+        print(f"\nRecall@{args.k} below {args.min_recall} for: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
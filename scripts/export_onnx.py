@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+# Exports the sentence-transformers embedding model to ONNX for EMBEDDING_BACKEND=onnx.
+#
+#   python scripts/export_onnx.py                 # fp32 + int8 graphs
+#   EMBEDDING_BACKEND=onnx ONNX_QUANTIZED=1 uvicorn main:app
+#
+# Output directory (default backend/models/<model>-onnx):
+#   model.onnx        transformer graph; input_ids/attention_mask/token_type_ids -> last_hidden_state
+#   model.int8.onnx   same graph with int8 dynamic quantization of the weights (--quantize)
+#   tokenizer.json    fast tokenizer, loaded with the `tokenizers` package at runtime
+#   export.json       pooling settings read by backend/embedding_backends.py
+# Pooling and normalization stay outside the graph, in NumPy, as sentence-transformers
+# does them. Needs torch + transformers (+ onnx for --quantize) at export time only;
+# the API server and build_vectordb.py then need onnxruntime and tokenizers.
+# Check the result with scripts/check_embedding_parity.py before switching over.
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# sentence-transformers' max_seq_length for all-MiniLM-L6-v2 (longer input is truncated)
+MAX_SEQ_LENGTH = 256
+OPSET = 17
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def _import_backend_module(name):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return __import__(name)
+
+
+def export_model(model_name, output_dir, max_seq_length, opset):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    class _HiddenStates(torch.nn.Module):
+        """Returns only the token embeddings, so the graph has a single named output."""
+
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(["warm-up query", "a second, somewhat longer sample sentence"],
+                       padding=True, truncation=True, max_length=max_seq_length, return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenStates(model),
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    info = {
+        "model": model_name,
+        "max_seq_length": max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "pooling": "mean",
+        "normalize": True,
+        "opset": opset,
+    }
+    with open(os.path.join(output_dir, "export.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    return model_path
+
+
+def quantize_model(model_path, output_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # Weights stored as int8, activations quantized on the fly: no calibration data needed
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+
+
+def main():
+    default_onnx_dir = _import_backend_module("embedding_backends").default_onnx_dir
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (optionally int8-quantized).")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output-dir", default=None, help="Default: backend/models/<model>-onnx.")
+    parser.add_argument("--max-seq-length", type=int, default=MAX_SEQ_LENGTH)
+    parser.add_argument("--opset", type=int, default=OPSET)
+    parser.add_argument("--quantize", action=argparse.BooleanOptionalAction, default=True,
+                        help="Also write the int8 dynamically quantized graph (default: on).")
+    args = parser.parse_args()
+    output_dir = args.output_dir or default_onnx_dir(args.model)
+
+    print(f"Exporting '{args.model}' to '{output_dir}' (opset {args.opset}, max {args.max_seq_length} tokens)...")
+    started = time.perf_counter()
+    model_path = export_model(args.model, output_dir, args.max_seq_length, args.opset)
+    print(f"  model.onnx: {os.path.getsize(model_path) / 1e6:.1f} MB in {time.perf_counter() - started:.1f}s")
+
+    if args.quantize:
+        started = time.perf_counter()
+        quantized_path = os.path.join(output_dir, "model.int8.onnx")
+        quantize_model(model_path, quantized_path)
+        print(f"  model.int8.onnx: {os.path.getsize(quantized_path) / 1e6:.1f} MB in {time.perf_counter() - started:.1f}s")
+
+    print("Done. Compare against the PyTorch model with scripts/check_embedding_parity.py.")
+
+
+if __name__ == "__main__":
+    main()
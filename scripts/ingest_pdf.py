@@ -1,49 +1,177 @@
-import fitz  # PyMuPDF [1, 2, 3, 4, 5]
+import fitz  # PyMuPDF
 import os
+import re
 import glob
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # --- CORRECTED PATHS ---
 # Paths are now relative to the project ROOT, pointing into your backend folder
 PDF_DIRECTORY = "backend/data/pdfs"
 OUTPUT_DIR = "backend/data/pdf_text"
 
-# Create the output directory if it doesn't exist
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Extraction processes (one PDF per process at a time)
+MAX_WORKERS = os.cpu_count() or 1
 
-print(f"Checking for PDFs in: {PDF_DIRECTORY}")
-pdf_files = glob.glob(os.path.join(PDF_DIRECTORY, "*.pdf"))
+# mtime/size/hash of every PDF extracted by a previous run
+MANIFEST_NAME = "pdf_manifest.json"
 
-if not pdf_files:
-    print(f"Warning: No PDF files found in {PDF_DIRECTORY}.")
-    print("Please add your college's PDF files to that folder.")
-else:
-    print(f"Found {len(pdf_files)} PDF(s). Starting processing...")
+# Sidecar written next to each .txt: character offset where every page starts.
+# Offsets are relative to the text that follows the "Source PDF:" line, i.e. what
+# build_vectordb.py reads after its readline(), so chunk start_index maps to a page.
+# It also carries the PDF's title and date (from its document info), which
+# build_vectordb.py records on every chunk for filtered retrieval.
+PAGES_SUFFIX = ".pages.json"
 
-for pdf_path in pdf_files:
-    try:
-        doc = fitz.open(pdf_path)
-        full_text = ""
-        base_filename = os.path.basename(pdf_path)
-        
-        print(f"  Processing: {base_filename}...")
-        
-        # Iterate through each page in the PDF [1, 3]
+# PDF date strings look like "D:20210815120000+05'30'"
+_PDF_DATE_RE = re.compile(r"^(?:D:)?(\d{4})(\d{2})?(\d{2})?")
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pdf_date(info):
+    """ISO date (YYYY-MM-DD) from the PDF's creation (else modification) date, or None."""
+    for key in ("creationDate", "modDate"):
+        m = _PDF_DATE_RE.match((info or {}).get(key) or "")
+        if m:
+            year, month, day = m.group(1), m.group(2) or "01", m.group(3) or "01"
+            if 1990 <= int(year) <= 2100:
+                return f"{year}-{month}-{day}"
+    return None
+
+
+def extract_pdf(pdf_path, output_dir, previous_hash=None):
+    """
+    Extract one PDF page by page, writing each page as soon as it is read.
+    Returns (base filename, status, sha256, page count) where status is
+    "extracted" or "unchanged".
+    """
+    base_filename = os.path.basename(pdf_path)
+    output_filename = os.path.join(output_dir, f"{base_filename}.txt")
+    pages_filename = output_filename + PAGES_SUFFIX
+
+    pdf_hash = sha256_file(pdf_path)
+    if pdf_hash == previous_hash and os.path.exists(output_filename):
+        return base_filename, "unchanged", pdf_hash, 0
+
+    page_offsets = []
+    doc_info = {}
+    tmp_output = output_filename + ".tmp"
+    # newline="" so what we count is exactly what gets written (no \r\n translation)
+    with fitz.open(pdf_path) as doc, open(tmp_output, "w", encoding="utf-8", newline="") as f:
+        f.write(f"Source PDF: {base_filename}\n\n")
+        doc_info = {"title": (doc.metadata or {}).get("title") or None, "date": pdf_date(doc.metadata)}
+        pos = 1  # the blank line after the header belongs to the body
         for page_num, page in enumerate(doc):
-            # Get plain text (UTF-8)
-            text = page.get_text().encode("utf8") [1, 3]
-            full_text += text.decode("utf8")
-            full_text += f"\n\n--- Page {page_num + 1} ---\n\n" # Add a page break
-            
-        # Save the extracted text
-        output_filename = os.path.join(OUTPUT_DIR, f"{base_filename}.txt")
-        
-        with open(output_filename, "w", encoding="utf-8") as f:
-            f.write(f"Source PDF: {base_filename}\n\n")
-            f.write(full_text)
-            
-        print(f"  Successfully extracted text to: {output_filename}")
-        
-    except Exception as e:
-        print(f"  Error processing {pdf_path}: {e}")
-
-print("PDF processing complete.")
\ No newline at end of file
+            text = page.get_text().replace("\r\n", "\n").replace("\r", "\n")
+            page_offsets.append(pos)
+            f.write(text)
+            pos += len(text)
+            page_break = f"\n\n--- Page {page_num + 1} ---\n\n"
+            f.write(page_break)
+            pos += len(page_break)
+
+    tmp_pages = pages_filename + ".tmp"
+    with open(tmp_pages, "w", encoding="utf-8") as f:
+        json.dump({"pdf": base_filename, "sha256": pdf_hash, "page_offsets": page_offsets, **doc_info}, f)
+    os.replace(tmp_output, output_filename)
+    os.replace(tmp_pages, pages_filename)
+    return base_filename, "extracted", pdf_hash, len(page_offsets)
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def ingest_pdfs(pdf_directory=PDF_DIRECTORY, output_dir=OUTPUT_DIR, workers=MAX_WORKERS):
+    # Create the output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    print(f"Checking for PDFs in: {pdf_directory}")
+    pdf_files = sorted(glob.glob(os.path.join(pdf_directory, "*.pdf")))
+
+    if not pdf_files:
+        print(f"Warning: No PDF files found in {pdf_directory}.")
+        print("Please add your college's PDF files to that folder.")
+        return {}
+
+    counts = {"extracted": 0, "unchanged": 0, "error": 0}
+    todo = []
+    for pdf_path in pdf_files:
+        base_filename = os.path.basename(pdf_path)
+        st = os.stat(pdf_path)
+        previous = manifest.get(base_filename, {})
+        output_filename = os.path.join(output_dir, f"{base_filename}.txt")
+        # Same mtime and size: skip without even hashing
+        if (previous.get("mtime_ns") == st.st_mtime_ns and previous.get("size") == st.st_size
+                and os.path.exists(output_filename)):
+            counts["unchanged"] += 1
+            continue
+        todo.append((pdf_path, st, previous.get("sha256")))
+
+    print(f"Found {len(pdf_files)} PDF(s), {len(todo)} new or modified. Starting processing with {workers} worker(s)...")
+    start = time.perf_counter()
+    total_pages = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(extract_pdf, pdf_path, output_dir, previous_hash): (pdf_path, st)
+                for pdf_path, st, previous_hash in todo
+            }
+            for fut in as_completed(futures):
+                pdf_path, st = futures[fut]
+                try:
+                    base_filename, status, pdf_hash, n_pages = fut.result()
+                except Exception as e:
+                    print(f"  Error processing {pdf_path}: {e}")
+                    counts["error"] += 1
+                    continue
+                counts[status] += 1
+                total_pages += n_pages
+                manifest[base_filename] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": pdf_hash}
+                if status == "extracted":
+                    print(f"  Extracted {n_pages} page(s) from: {base_filename}")
+    finally:
+        save_manifest(manifest_path, manifest)
+
+    elapsed = time.perf_counter() - start
+    rate = total_pages / elapsed if elapsed > 0 else 0.0
+    print(f"{counts['extracted']} extracted, {counts['unchanged']} unchanged, {counts['error']} failed "
+          f"({total_pages} pages in {elapsed:.1f}s, {rate:.1f} pages/sec)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract text from PDFs for the vector DB.")
+    parser.add_argument("--pdf-dir", default=PDF_DIRECTORY)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    ingest_pdfs(args.pdf_dir, args.output_dir, max(1, args.workers))
+    print("PDF processing complete.")
+
+
+if __name__ == "__main__":
+    main()
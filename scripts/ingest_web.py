@@ -1,63 +1,305 @@
 import requests
-from bs4 import BeautifulSoup 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import deque
+from urllib.parse import urljoin, urldefrag, urlparse
+import argparse
+import hashlib
+import json
 import os
 import re
+import threading
+import time
 
 # --- Configuration (YOU MUST CHANGE THIS) ---
 URLS_TO_SCRAPE = [
-    "https.nita.ac.in/about/vision-mission",
-    "https.nita.ac.in/academics/departments",
-    #... add all other pages [4]
+    "https://www.nita.ac.in/about/vision-mission",
+    "https://www.nita.ac.in/academics/departments",
+    #... add all other pages
 ]
 TARGET_SELECTORS = [
     "div#main-content",          # Example: <div id="main-content">...</div>
     "div.content",             # Example: <div class="content">...</div>
-    #... find your real selectors by Inspecting the page [6]
+    #... find your real selectors by Inspecting the page
 ]
+
+# Crawler settings
+MAX_WORKERS = 8            # parallel requests in flight
+PER_HOST_DELAY = 0.25      # minimum seconds between requests to the same host
+REQUEST_TIMEOUT = 10
+MAX_PAGES = 2000           # cap on pages visited when --discover is on
+USER_AGENT = "NITai-ingest/1.0 (+https://www.nita.ac.in)"
+
+# Links to these file types are never fetched as pages
+SKIP_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".rar",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp4", ".mp3",
+)
 # --- End Configuration ---
 
 # --- CORRECTED PATH ---
 OUTPUT_DIR = "backend/data/web_text"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-print(f"Starting web scrape for {len(URLS_TO_SCRAPE)} URLs...")
+# ETag / Last-Modified / content hash per URL from the previous run
+MANIFEST_NAME = "crawl_manifest.json"
+
+# Sidecar written next to each page's .txt with its URL, title and date;
+# build_vectordb.py records them on every chunk for filtered retrieval
+META_SUFFIX = ".meta.json"
+
+# <meta> tags that carry a page's publication date, most specific first
+DATE_META_TAGS = (
+    "article:published_time", "og:published_time", "datePublished", "date",
+    "DC.date.issued", "DC.date", "article:modified_time", "last-modified",
+)
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by at least `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        if self.delay <= 0:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(pool_size):
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def url_to_filename(url):
+    filename = url.replace('https://', '').replace('http://', '').replace('/', '_').replace('.', '_')
+    filename = re.sub(r'[^a-zA-Z0-9_]', '', filename)
+    return f"{filename}.txt"
+
+
+def normalize_url(url):
+    url, _ = urldefrag(url)
+    return url
+
+
+def extract_text(soup):
+    for selector in TARGET_SELECTORS:
+        containers = soup.select(selector)
+        if containers:
+            text = "\n".join(c.get_text(separator=" ", strip=True) for c in containers)
+            if text.strip():
+                return text
+    return ""
+
+
+def page_date(soup):
+    """
+    ISO date (YYYY-MM-DD) of a page from its <meta> or <time> tags, else None.
+    The Last-Modified header is not used: dynamic pages set it to the fetch time.
+    """
+    candidates = []
+    for name in DATE_META_TAGS:
+        tag = soup.find("meta", attrs={"property": name}) or soup.find("meta", attrs={"name": name}) \
+            or soup.find("meta", attrs={"itemprop": name})
+        if tag and tag.get("content"):
+            candidates.append(tag["content"])
+    time_tag = soup.find("time", attrs={"datetime": True})
+    if time_tag:
+        candidates.append(time_tag["datetime"])
+    for value in candidates:
+        m = _ISO_DATE_RE.search(value)
+        if m:
+            return m.group(0)
+    return None
+
+
+def write_page_meta(output_path, url, soup, last_modified):
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    # last_modified is informational only; "date" is what retrieval filters on
+    meta = {"url": url, "title": title or None, "date": page_date(soup), "last_modified": last_modified}
+    with open(output_path + META_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def extract_links(soup, base_url, allowed_hosts):
+    links = set()
+    for a in soup.find_all("a", href=True):
+        link = normalize_url(urljoin(base_url, a["href"]))
+        parsed = urlparse(link)
+        if parsed.scheme not in ("http", "https") or parsed.netloc not in allowed_hosts:
+            continue
+        if parsed.path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        links.add(link)
+    return sorted(links)
+
 
-for url in URLS_TO_SCRAPE:
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def fetch_page(session, limiter, url, previous, output_dir, timeout, discover, allowed_hosts):
+    """
+    Fetch one page with a conditional GET and save its text if it changed.
+    Returns (status, manifest entry, discovered links) where status is one of
+    "saved", "not-modified", "unchanged", "no-content" or "error".
+    """
+    headers = {}
+    # links are only stored by --discover crawls; without them a 304 would end discovery
+    # at this page, so fetch it in full once
+    if not (discover and "links" not in previous):
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    limiter.wait(url)
     try:
-        page = requests.get(url, timeout=10)
+        page = session.get(url, headers=headers, timeout=timeout)
+        if page.status_code == 304:
+            return "not-modified", previous, previous.get("links", [])
         page.raise_for_status()
-        
-        soup = BeautifulSoup(page.content, "html.parser")
-        
-        content_found = False
-        full_text = ""
-        
-        for selector in TARGET_SELECTORS:
-            containers = soup.select(selector) [6]
-            
-            if containers:
-                for container in containers:
-                    full_text += container.get_text(separator=" ", strip=True) [6]
-                
-                if full_text.strip():
-                    content_found = True
-                    break
-        
-        if content_found:
-            filename = url.replace('https://', '').replace('http://', '').replace('/', '_').replace('.', '_')
-            filename = re.sub(r'[^a-zA-Z0-9_]', '', filename)
-            filename = f"{filename}.txt"
-            
-            output_path = os.path.join(OUTPUT_DIR, filename)
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(f"Source URL: {url}\n\n")
-                f.write(full_text)
-                
-            print(f"  Scraped and saved: {url}")
-        else:
-            print(f"  Warning: No target content selectors found for {url}")
-            
     except requests.RequestException as e:
         print(f"  Error fetching {url}: {e}")
+        return "error", previous, []
+
+    entry = {
+        "etag": page.headers.get("ETag"),
+        "last_modified": page.headers.get("Last-Modified"),
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+    soup = BeautifulSoup(page.content, "html.parser")
+    links = extract_links(soup, page.url, allowed_hosts) if discover else []
+    if discover:
+        entry["links"] = links
+
+    full_text = extract_text(soup)
+    if not full_text:
+        print(f"  Warning: No target content selectors found for {url}")
+        return "no-content", entry, links
+
+    content_hash = hashlib.sha256(full_text.encode("utf-8")).hexdigest()
+    filename = url_to_filename(url)
+    entry["content_hash"] = content_hash
+    entry["file"] = filename
+    output_path = os.path.join(output_dir, filename)
+    if previous.get("content_hash") == content_hash and os.path.exists(output_path):
+        if not os.path.exists(output_path + META_SUFFIX):
+            write_page_meta(output_path, url, soup, entry["last_modified"])  # page saved by an older crawl
+        return "unchanged", entry, links
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(f"Source URL: {url}\n\n")
+        f.write(full_text)
+    write_page_meta(output_path, url, soup, entry["last_modified"])
+    print(f"  Scraped and saved: {url}")
+    return "saved", entry, links
+
+
+def crawl(seeds, output_dir=OUTPUT_DIR, workers=MAX_WORKERS, delay=PER_HOST_DELAY, timeout=REQUEST_TIMEOUT,
+          discover=False, max_pages=MAX_PAGES, max_depth=None):
+    """
+    Crawl `seeds` (and, with `discover`, same-host links found on them) using a
+    pooled session and at most `workers` requests in flight. Returns per-status counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    seeds = [normalize_url(u) for u in seeds]
+    allowed_hosts = {urlparse(u).netloc for u in seeds}
+    session = make_session(workers)
+    limiter = HostRateLimiter(delay)
+
+    counts = {"saved": 0, "not-modified": 0, "unchanged": 0, "no-content": 0, "error": 0}
+    seen = set(seeds)
+    frontier = deque((u, 0) for u in seeds)
+    start = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while frontier or running:
+                while frontier and len(running) < workers:
+                    url, depth = frontier.popleft()
+                    fut = pool.submit(fetch_page, session, limiter, url, manifest.get(url, {}),
+                                      output_dir, timeout, discover, allowed_hosts)
+                    running[fut] = (url, depth)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    url, depth = running.pop(fut)
+                    try:
+                        status, entry, links = fut.result()
+                    except Exception as e:  # e.g. OSError writing the page; keep crawling
+                        print(f"  Error processing {url}: {e!r}")
+                        counts["error"] += 1
+                        continue
+                    counts[status] += 1
+                    if entry:
+                        manifest[url] = entry
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    for link in links:
+                        if link not in seen and len(seen) < max_pages:
+                            seen.add(link)
+                            frontier.append((link, depth + 1))
+    finally:
+        session.close()
+        save_manifest(manifest_path, manifest)
+
+    elapsed = time.perf_counter() - start
+    print(f"Visited {sum(counts.values())} page(s) in {elapsed:.1f}s: " +
+          ", ".join(f"{n} {status}" for status, n in counts.items()))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape configured pages into text files for the vector DB.")
+    parser.add_argument("urls", nargs="*", help="Seed URLs (defaults to URLS_TO_SCRAPE).")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Max parallel requests.")
+    parser.add_argument("--delay", type=float, default=PER_HOST_DELAY, help="Min seconds between requests per host.")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT)
+    parser.add_argument("--discover", action="store_true", help="Follow same-host links found on the seed pages.")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    parser.add_argument("--max-depth", type=int, default=None, help="Link depth limit for --discover.")
+    args = parser.parse_args()
+
+    seeds = args.urls or URLS_TO_SCRAPE
+    print(f"Starting web scrape for {len(seeds)} seed URL(s)...")
+    crawl(seeds, output_dir=args.output_dir, workers=max(1, args.workers), delay=args.delay,
+          timeout=args.timeout, discover=args.discover, max_pages=args.max_pages, max_depth=args.max_depth)
+    print("Web scraping complete.")
+
 
-print("Web scraping complete.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# backend/ modules import each other as top-level modules (the API runs from backend/),
+# and the ingest/build scripts are plain scripts, so put both directories on the path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _dir in (os.path.join(ROOT, "backend"), os.path.join(ROOT, "scripts")):
+    if _dir not in sys.path:
+        sys.path.insert(0, _dir)
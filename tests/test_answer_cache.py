@@ -0,0 +1,34 @@
+from answer_cache import SemanticAnswerCache, exact_terms
+
+# Stand-in for two MiniLM embeddings of near-identical queries: well above the threshold
+VECTOR = [0.6, 0.8, 0.0]
+NEAR_VECTOR = [0.61, 0.79, 0.01]
+
+
+def test_exact_terms():
+    assert exact_terms("What is the MA101 syllabus?") == "101 ma101"
+    assert exact_terms("fee structure 2024") == "2024"
+    assert exact_terms("when is the mid sem exam") == ""
+
+
+def test_semantic_hit_for_paraphrase():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put(VECTOR, {"answer": "mid-sem answer"}, query="When is the mid-sem exam?")
+    assert cache.get(NEAR_VECTOR, query="mid sem exam date?") == {"answer": "mid-sem answer"}
+
+
+def test_queries_with_different_codes_do_not_share_answers():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put(VECTOR, {"answer": "MA101 answer"}, query="MA101 syllabus")
+    cache.put(VECTOR, {"answer": "2023 fee answer"}, query="2023 fee")
+
+    assert cache.get(NEAR_VECTOR, query="MA102 syllabus") is None
+    assert cache.get(NEAR_VECTOR, query="2024 fee") is None
+    assert cache.get(NEAR_VECTOR, query="ma101 SYLLABUS") == {"answer": "MA101 answer"}
+    assert cache.get(NEAR_VECTOR, query="fee for 2023") == {"answer": "2023 fee answer"}
+
+
+def test_scopes_are_separate():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put(VECTOR, {"answer": "all departments"}, query="exam schedule")
+    assert cache.get(VECTOR, scope='{"department":["cse"]}', query="exam schedule") is None
@@ -0,0 +1,46 @@
+import chromadb
+import pytest
+
+import build_vectordb
+
+
+@pytest.fixture
+def collection(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "db"))
+    return client.get_or_create_collection(build_vectordb.COLLECTION_NAME)
+
+
+def _add(collection, ids, hashes, extra=None):
+    collection.add(
+        ids=ids,
+        embeddings=[[1.0, float(i)] for i in range(len(ids))],
+        documents=[f"text {h}" for h in hashes],
+        metadatas=[{"chunk_hash": h, **(extra or {})} for h in hashes],
+    )
+
+
+def test_update_metadatas_drops_removed_keys(collection):
+    _add(collection, ["a", "b"], ["h1", "h2"], {"date": 20240101, "year": 2024, "page": 3})
+    build_vectordb.update_metadatas(collection, ["a", "b"], [{"chunk_hash": "h1", "year": 2023},
+                                                             {"chunk_hash": "h2", "page": 4}])
+
+    stored = collection.get(ids=["a", "b"], include=["metadatas"])
+    assert dict(zip(stored["ids"], stored["metadatas"])) == {
+        "a": {"chunk_hash": "h1", "year": 2023},
+        "b": {"chunk_hash": "h2", "page": 4},
+    }
+    assert collection.get(where={"date": 20240101})["ids"] == []
+
+
+def test_deleted_chunks_are_pruned_from_embedding_cache(collection, tmp_path):
+    _add(collection, ["a", "b", "c"], ["h1", "h2", "h2"])
+    cache = build_vectordb.EmbeddingCache(str(tmp_path / "cache.sqlite"), "model")
+    cache.put_many([("h1", [1.0]), ("h2", [2.0]), ("h3", [3.0])])
+
+    dropped = set()
+    build_vectordb.delete_ids(collection, ["a", "b"], dropped)
+    assert dropped == {"h1", "h2"}
+    # "c" still has the text of "b", so its vector stays cached
+    assert build_vectordb.prune_embedding_cache(collection, cache, dropped) == 1
+    assert set(cache.get_many(["h1", "h2", "h3"])) == {"h2", "h3"}
+    cache.close()
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from embedding_service import EmbeddingServer, EmbeddingServiceClient, ServiceEmbeddings
+
+SERVICE_VECTOR = [1.0, 0.0]
+LOCAL_VECTOR = [0.0, 1.0]
+
+
+class _LocalModel:
+    def embed_documents(self, texts):
+        return [LOCAL_VECTOR for _ in texts]
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return os.path.join(str(tmp_path), "embeddings.sock")
+
+
+def _serve(socket_path, model):
+    server = EmbeddingServer(socket_path, lambda texts: [SERVICE_VECTOR for _ in texts], model)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def test_new_connection_to_wrong_model_is_never_used(socket_path):
+    server = _serve(socket_path, "model-a")
+    embeddings = ServiceEmbeddings(EmbeddingServiceClient(socket_path, model_name="model-a"), _LocalModel)
+    assert embeddings.embed_query("x") == SERVICE_VECTOR
+
+    _stop(server)
+    server = _serve(socket_path, "model-b")
+    try:
+        # the first embed on a fresh thread's connection must already be checked
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            assert pool.submit(embeddings.embed_query, "x").result() == LOCAL_VECTOR
+        assert not embeddings.client.model_matches
+    finally:
+        _stop(server)
+
+
+def test_mismatch_is_rechecked_after_retry_interval(socket_path):
+    server = _serve(socket_path, "model-b")
+    client = EmbeddingServiceClient(socket_path, retry_interval_s=0.05, model_name="model-a")
+    embeddings = ServiceEmbeddings(client, _LocalModel)
+    assert embeddings.embed_query("x") == LOCAL_VECTOR
+
+    _stop(server)
+    server = _serve(socket_path, "model-a")  # misconfiguration fixed
+    try:
+        time.sleep(0.1)
+        assert embeddings.embed_query("x") == SERVICE_VECTOR
+        assert client.model_matches
+    finally:
+        _stop(server)
@@ -0,0 +1,61 @@
+import ingest_web
+
+PAGES = {
+    "http://site.test/": '<html><div id="main-content">Home <a href="/a">A</a></div></html>',
+    "http://site.test/a": '<html><div id="main-content">Page A</div></html>',
+}
+
+
+class _Response:
+    def __init__(self, url, status_code, body=""):
+        self.url = url
+        self.status_code = status_code
+        self.content = body.encode("utf-8")
+        self.headers = {"ETag": f'"{url}"'} if status_code == 200 else {}
+
+    def raise_for_status(self):
+        pass
+
+
+class _Session:
+    """Serves PAGES and honours If-None-Match like a real server."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        if (headers or {}).get("If-None-Match") == f'"{url}"':
+            return _Response(url, 304)
+        return _Response(url, 200, PAGES[url])
+
+    def close(self):
+        pass
+
+
+def _crawl(monkeypatch, tmp_path, discover):
+    session = _Session()
+    monkeypatch.setattr(ingest_web, "make_session", lambda pool_size: session)
+    counts = ingest_web.crawl(["http://site.test/"], output_dir=str(tmp_path), workers=2, delay=0,
+                              discover=discover)
+    return counts, session
+
+
+def test_discover_after_plain_crawl_follows_links(monkeypatch, tmp_path):
+    counts, _ = _crawl(monkeypatch, tmp_path, discover=False)
+    assert counts["saved"] == 1
+
+    counts, session = _crawl(monkeypatch, tmp_path, discover=True)
+    fetched = [url for url, _ in session.requests]
+    assert fetched == ["http://site.test/", "http://site.test/a"]
+    # the seed had no stored links, so it was fetched unconditionally
+    assert "If-None-Match" not in session.requests[0][1]
+    assert counts["unchanged"] == 1 and counts["saved"] == 1
+
+
+def test_discover_recrawl_uses_stored_links(monkeypatch, tmp_path):
+    _crawl(monkeypatch, tmp_path, discover=True)
+
+    counts, session = _crawl(monkeypatch, tmp_path, discover=True)
+    assert all("If-None-Match" in headers for _, headers in session.requests)
+    assert counts["not-modified"] == 2
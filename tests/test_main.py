@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import vector_index
+from answer_cache import SemanticAnswerCache
+
+
+def test_index_fingerprint_covers_numpy_and_lexical_indexes(monkeypatch, tmp_path):
+    vector_dir, lexical_dir = tmp_path / "numpy_index", tmp_path / "lexical_index"
+    vector_dir.mkdir()
+    lexical_dir.mkdir()
+    monkeypatch.setattr(main, "RETRIEVAL_BACKEND", "numpy")
+    monkeypatch.setattr(main, "VECTOR_INDEX_DIR", str(vector_dir))
+    monkeypatch.setattr(main, "HYBRID_RETRIEVAL", True)
+    monkeypatch.setattr(main, "LEXICAL_INDEX_DIR", str(lexical_dir))
+
+    before = main._index_fingerprint()
+    (lexical_dir / "vocab.json").write_text("{}")
+    after_lexical = main._index_fingerprint()
+    assert after_lexical != before
+
+    # build_vectordb.py swaps a rebuilt index in as a new directory
+    os.rename(vector_dir, tmp_path / "old")
+    vector_dir.mkdir()
+    assert main._index_fingerprint() != after_lexical
+
+
+def _wait_for_background_init():
+    deadline = time.monotonic() + 5
+    while main._init_future is not None and not main._init_future.done():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_failed_warm_up_is_retried_by_readiness_probe(monkeypatch):
+    attempts = []
+
+    def warm_up():
+        attempts.append(1)
+        main._component_status["warmup"]["ready"] = len(attempts) > 1
+        return len(attempts) > 1
+
+    monkeypatch.setattr(main, "WARMUP_ON_STARTUP", True)
+    monkeypatch.setattr(main, "warm_up", warm_up)
+    monkeypatch.setattr(main, "_vectorstore_ready", True)
+    monkeypatch.setattr(main, "_init_future", None)
+    monkeypatch.setitem(main._component_status, "warmup", {"ready": False, "load_seconds": None, "error": None})
+
+    with TestClient(main.app) as client:  # startup runs the first (failing) warm-up
+        _wait_for_background_init()
+        assert attempts == [1]
+        assert client.get("/health/ready").status_code == 503  # starts a second attempt
+        _wait_for_background_init()
+        assert client.get("/health/ready").status_code == 200
+    assert len(attempts) == 2
+
+
+class _HashEmbeddings:
+    """Deterministic pseudo-random vectors; enough to compare search paths."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        rng = np.random.default_rng(int.from_bytes(text.encode("utf-8"), "little") % 2**32)
+        return rng.normal(size=8).tolist()
+
+
+def test_chroma_batch_search_matches_per_query_search(monkeypatch, tmp_path):
+    from langchain_community.vectorstores import Chroma
+
+    embeddings = _HashEmbeddings()
+    db = Chroma.from_texts(
+        [f"chunk {i}" for i in range(40)], embeddings,
+        metadatas=[{"source": f"doc{i % 3}.pdf", "year": 2021 + i % 2} for i in range(40)],
+        persist_directory=str(tmp_path),
+    )
+    monkeypatch.setattr(main, "RETRIEVAL_BACKEND", "chroma")
+    monkeypatch.setattr(main, "vectordb", db)
+    monkeypatch.setattr(main, "lexical_index", None)
+    queries = [f"query {i}" for i in range(5)]
+    vectors = [embeddings.embed_query(q) for q in queries]
+
+    batched = main._search_docs(queries, vectors, 4)
+    single = [db.similarity_search_by_vector(v, k=4) for v in vectors]
+    assert [[d.page_content for d in docs] for docs in batched] == [[d.page_content for d in docs] for docs in single]
+
+    filtered = main._search_docs(queries, vectors, 4, main.normalize_filters({"year": 2022}))
+    assert all(len(docs) == 4 and all(d.metadata["year"] == 2022 for d in docs) for docs in filtered)
+
+
+class _FakeIndex:
+    """Numpy-backend stand-in: one fixed chunk per query."""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def similarity_search_by_vectors(self, embeddings, k=4, filter=None):
+        from langchain_core.documents import Document
+
+        return [[Document(page_content="Mid-sem exams start on 1 March.", metadata={"source": "notice.pdf"})]
+                for _ in embeddings]
+
+
+@pytest.fixture
+def unloaded(monkeypatch):
+    """main with nothing loaded, the numpy backend and a counting embeddings loader."""
+    loads = []
+
+    def load_embeddings(*args, **kwargs):
+        loads.append(1)
+        time.sleep(0.05)  # wide window for concurrent first requests
+        if getattr(load_embeddings, "fail", False):
+            raise OSError("model download timed out")
+        return _HashEmbeddings()
+
+    monkeypatch.setattr(main, "load_embeddings", load_embeddings)
+    monkeypatch.setattr(vector_index, "NumpyVectorIndex", _FakeIndex)
+    monkeypatch.setattr(main, "RETRIEVAL_BACKEND", "numpy")
+    monkeypatch.setattr(main, "HYBRID_RETRIEVAL", False)
+    monkeypatch.setattr(main, "EMBEDDING_SERVICE_SOCKET", "")
+    monkeypatch.setattr(main, "_vectorstore_ready", False)
+    monkeypatch.setattr(main, "embeddings", None)
+    monkeypatch.setattr(main, "vectordb", None)
+    monkeypatch.setattr(main, "lexical_index", None)
+    monkeypatch.setattr(main, "embedding_batcher", None)
+    for name in ("embeddings", "vectordb"):
+        monkeypatch.setitem(main._component_status, name, {"ready": False, "load_seconds": None, "error": None})
+    return load_embeddings, loads
+
+
+def test_concurrent_first_requests_load_once(unloaded):
+    _, loads = unloaded
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: main.init_vectorstore_and_embeddings(), range(8)))
+    assert results == [True] * 8
+    assert loads == [1]
+    assert isinstance(main.vectordb, _FakeIndex) and main._component_status["vectordb"]["ready"]
+
+
+def test_failed_init_is_retried(unloaded):
+    load_embeddings, loads = unloaded
+    load_embeddings.fail = True
+    assert main.init_vectorstore_and_embeddings() is False
+    assert not main._vectorstore_ready
+    assert "model download timed out" in main._component_status["embeddings"]["error"]
+
+    load_embeddings.fail = False
+    assert main.init_vectorstore_and_embeddings() is True
+    assert len(loads) == 2 and main._component_status["embeddings"]["ready"]
+
+
+def test_answers_are_cached_and_concurrent_duplicates_share_one_llm_call(unloaded, monkeypatch):
+    prompts = []
+    gate = threading.Event()
+
+    def call_llm(prompt_text):
+        prompts.append(prompt_text)
+        gate.wait(5)
+        return "1 March"
+
+    monkeypatch.setattr(main, "_call_llm_with_prompt", call_llm)
+    monkeypatch.setattr(main, "answer_cache", SemanticAnswerCache(threshold=0.95))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(main.answer_with_retrieval, "When is the mid-sem exam?") for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while main.answer_cache.stats()["deduplicated_inflight"] < 3:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        gate.set()
+        results = [f.result() for f in futures]
+
+    assert len(prompts) == 1
+    assert all(r == {"answer": "1 March", "sources": ["notice.pdf"]} for r in results)
+    # later: served from the cache without another LLM call
+    assert main.answer_with_retrieval("When is the mid-sem exam?")["answer"] == "1 March"
+    assert len(prompts) == 1 and main.answer_cache.stats()["hits"] == 1